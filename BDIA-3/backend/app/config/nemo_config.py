@@ -18,6 +18,27 @@ class NeMoConfig(BaseSettings):
     TOP_P: float = float(os.getenv("NEMO_TOP_P", "0.9"))
     USE_GPU: bool = os.getenv("NEMO_USE_GPU", "false").lower() == "true"
 
+    # Inference profile: "default" keeps fp32 on the best available device,
+    # "cpu" forces CPU with dynamic int8 quantization and pinned thread counts
+    INFERENCE_PROFILE: str = os.getenv("NEMO_INFERENCE_PROFILE", "default")
+    CPU_INTRA_OP_THREADS: int = int(os.getenv("NEMO_CPU_INTRA_OP_THREADS", "0"))
+    CPU_INTER_OP_THREADS: int = int(os.getenv("NEMO_CPU_INTER_OP_THREADS", "1"))
+
+    # Inference executor settings
+    INFERENCE_WORKERS: int = int(os.getenv("NEMO_INFERENCE_WORKERS", "1"))
+    INFERENCE_MAX_QUEUE: int = int(os.getenv("NEMO_INFERENCE_MAX_QUEUE", "32"))
+
+    # Text embedding micro-batching
+    EMBED_BATCH_SIZE: int = int(os.getenv("NEMO_EMBED_BATCH_SIZE", "16"))
+    EMBED_BATCH_WAIT_MS: float = float(os.getenv("NEMO_EMBED_BATCH_WAIT_MS", "5"))
+
+    # Number of document context embeddings kept per service instance
+    CONTEXT_CACHE_SIZE: int = int(os.getenv("NEMO_CONTEXT_CACHE_SIZE", "256"))
+
+    # Visual summary page selection
+    VISUAL_SUMMARY_TOP_K: int = int(os.getenv("NEMO_VISUAL_SUMMARY_TOP_K", "3"))
+    SALIENCE_THUMBNAIL_DPI: int = int(os.getenv("NEMO_SALIENCE_THUMBNAIL_DPI", "24"))
+
     class Config:
         env_prefix = "NEMO_"
         env_file = ".env"
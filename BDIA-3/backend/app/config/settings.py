@@ -25,11 +25,69 @@ class Settings(BaseSettings):
     SNOWFLAKE_DATABASE: str = os.getenv("SNOWFLAKE_DATABASE", "PUBLICATIONS_DB")
     SNOWFLAKE_SCHEMA: str = os.getenv("SNOWFLAKE_SCHEMA", "PUBLICATIONS_SCHEMA")
     
+    # Storage: "snowflake", or "sqlite" to run against a local database with the same schema
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "snowflake")
+    SQLITE_DATABASE_PATH: str = os.getenv("SQLITE_DATABASE_PATH", "./data/local_warehouse.sqlite")
+    
+    SNOWFLAKE_POOL_SIZE: int = int(os.getenv("SNOWFLAKE_POOL_SIZE", "5"))
+    SNOWFLAKE_POOL_IDLE_TIMEOUT: float = float(os.getenv("SNOWFLAKE_POOL_IDLE_TIMEOUT", "300"))
+    SNOWFLAKE_POOL_HEALTH_CHECK_INTERVAL: float = float(os.getenv("SNOWFLAKE_POOL_HEALTH_CHECK_INTERVAL", "60"))
+    SNOWFLAKE_POOL_CHECKOUT_TIMEOUT: float = float(os.getenv("SNOWFLAKE_POOL_CHECKOUT_TIMEOUT", "30"))
+    # Long queries are submitted asynchronously and polled up to this interval
+    SNOWFLAKE_ASYNC_POLL_INTERVAL: float = float(os.getenv("SNOWFLAKE_ASYNC_POLL_INTERVAL", "2"))
+    SNOWFLAKE_ASYNC_QUERY_TIMEOUT: float = float(os.getenv("SNOWFLAKE_ASYNC_QUERY_TIMEOUT", "600"))
+    
+    # Document read-through cache
+    DOCUMENT_CACHE_TTL_SECONDS: float = float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "300"))
+    DOCUMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "10000"))
+    DOCUMENT_CACHE_REDIS_URL: str = os.getenv("DOCUMENT_CACHE_REDIS_URL", "")  # empty keeps the cache in-process
+    DOCUMENT_CACHE_LOCAL_TTL_SECONDS: float = float(os.getenv("DOCUMENT_CACHE_LOCAL_TTL_SECONDS", "10"))
+    CATALOG_VERSION_CHECK_SECONDS: float = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "30"))
+    
+    # Write-behind buffer for Q&A logs and research summaries
+    WRITE_BUFFER_MAX_ROWS: int = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "500"))
+    WRITE_BUFFER_MAX_DELAY_SECONDS: float = float(os.getenv("WRITE_BUFFER_MAX_DELAY_SECONDS", "2"))
+    WRITE_BUFFER_SPILL_DIR: str = os.getenv("WRITE_BUFFER_SPILL_DIR", "./data/write_buffer")
+    WRITE_BUFFER_MAX_PENDING_ROWS: int = int(os.getenv("WRITE_BUFFER_MAX_PENDING_ROWS", "20000"))
+    WRITE_BUFFER_MAX_ATTEMPTS: int = int(os.getenv("WRITE_BUFFER_MAX_ATTEMPTS", "5"))
+    
     # NVIDIA
     NVIDIA_API_KEY: str = os.getenv("NVIDIA_API_KEY", "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")
+    NVIDIA_MODEL_ENDPOINT: str = os.getenv("NVIDIA_MODEL_ENDPOINT", "")  # multimodal RAG LLM endpoint
+    
+    # Embeddings: "local" runs the Hugging Face model, "onnx" the exported ONNX Runtime model
+    EMBED_BACKEND: str = os.getenv("EMBED_BACKEND", "local")
+    EMBED_MODEL_NAME: str = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-large-en-v1.5")
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    EMBED_ONNX_PATH: str = os.getenv("EMBED_ONNX_PATH", "./data/onnx/bge-large-en-v1.5")
+    EMBED_ONNX_QUANTIZED: bool = os.getenv("EMBED_ONNX_QUANTIZED", "true").lower() == "true"
     
     # Storage
     VECTOR_STORE_PATH: str = "./data/vector_store"
+    VISUAL_INDEX_PATH: str = os.getenv("VISUAL_INDEX_PATH", "./data/visual_index")
+    VISUAL_INDEX_CACHE_MAX_BYTES: int = int(os.getenv("VISUAL_INDEX_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    INDEX_CACHE_MAX_BYTES: int = int(os.getenv("INDEX_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    INDEX_CACHE_PINNED: str = os.getenv("INDEX_CACHE_PINNED", "")  # comma-separated document ids
+    NOTE_TREND_INDEX_PATH: str = os.getenv("NOTE_TREND_INDEX_PATH", "./data/note_trends.pkl")
+    
+    # Summarization (map-reduce)
+    SUMMARY_CHUNK_SIZE: int = int(os.getenv("SUMMARY_CHUNK_SIZE", "4000"))
+    SUMMARY_CONTEXT_CHARS: int = int(os.getenv("SUMMARY_CONTEXT_CHARS", "12000"))
+    SUMMARY_MAX_CONCURRENCY: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "8"))
+    SUMMARY_STORE_PATH: str = os.getenv("SUMMARY_STORE_PATH", "./data/summary_store.sqlite")
+    
+    # NVIDIA API client limits (shared by every caller in the process)
+    NVIDIA_BASE_URL: str = os.getenv("NVIDIA_BASE_URL", "")  # empty uses the hosted endpoint
+    NVIDIA_REQUESTS_PER_MINUTE: float = float(os.getenv("NVIDIA_REQUESTS_PER_MINUTE", "40"))
+    NVIDIA_TOKENS_PER_MINUTE: float = float(os.getenv("NVIDIA_TOKENS_PER_MINUTE", "100000"))
+    NVIDIA_MAX_IN_FLIGHT: int = int(os.getenv("NVIDIA_MAX_IN_FLIGHT", "8"))
+    NVIDIA_MAX_RETRIES: int = int(os.getenv("NVIDIA_MAX_RETRIES", "5"))
+    NVIDIA_BACKOFF_BASE_SECONDS: float = float(os.getenv("NVIDIA_BACKOFF_BASE_SECONDS", "1.0"))
+    NVIDIA_BACKOFF_MAX_SECONDS: float = float(os.getenv("NVIDIA_BACKOFF_MAX_SECONDS", "30.0"))
+    
+    # Semantic answer cache
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "100"))
     
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
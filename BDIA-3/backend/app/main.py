@@ -1,12 +1,20 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.privacy import PrivacyMiddleware
 from app.router import documents, qa, search, auth, research_note, reports
 from app.services.multimodal_rag_service import MultiModalRAGService
-from app.services.nemo_service import NeMoMultimodalService
-from app.services.report_generation_service import ReportService
+from app.services.nemo_multimodal_service import NeMoMultimodalService
+from app.services.report_service import ReportService
 from app.services.validation_service import ValidationService
 from app.services.vector_store_service import VectorStoreService
+from app.services.inference_executor import get_inference_executor, InferenceQueueFullError
+from app.services.single_flight import get_single_flight
+from app.services.storage_backend import get_storage_backend
+from app.services.document_cache import get_document_cache
+from app.services.write_buffer import get_write_buffer
+from app.services.note_trend_index import get_note_trend_index
+from app.config.settings import settings
 
 # Initialize FastAPI app
 app = FastAPI(title="Document Explorer API")
@@ -34,6 +42,15 @@ async def privacy_middleware_handler(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Reject inference work quickly when the executor queue is saturated
+@app.exception_handler(InferenceQueueFullError)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFullError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
 # Initialize services
 nemo_service = NeMoMultimodalService()
 report_service = ReportService(nemo_service)
@@ -48,6 +65,45 @@ app.state.validation_service = validation_service
 app.state.vector_store = vector_store
 app.state.multimodal_rag_service = multimodal_rag_service
 
+@app.get("/health/inference", tags=["Health"])
+async def inference_stats():
+    """Inference executor queue depth and wait times, plus coalesced requests"""
+    return {
+        **get_inference_executor().stats(),
+        "single_flight": get_single_flight().stats()
+    }
+
+@app.get("/health/snowflake", tags=["Health"])
+async def snowflake_pool_stats():
+    """Storage backend (Snowflake pool) usage and document cache hit rates"""
+    return {
+        **get_storage_backend().stats(),
+        "document_cache": get_document_cache().stats(),
+        "write_buffer": get_write_buffer().stats()
+    }
+
+@app.on_event("startup")
+async def recover_buffered_writes():
+    # Replay rows a previous worker queued but never wrote
+    await get_write_buffer().recover()
+
+@app.on_event("startup")
+async def backfill_note_trends():
+    # Notes written while no trend index was persisted get folded in once
+    try:
+        await research_note.notes_service.backfill_note_trends()
+    except Exception as e:
+        print(f"Warning: {str(e)}")
+
+@app.on_event("shutdown")
+async def close_storage_backend():
+    await get_write_buffer().close()
+    get_storage_backend().close_all()
+
+@app.on_event("shutdown")
+async def save_note_trends():
+    get_note_trend_index().save(settings.NOTE_TREND_INDEX_PATH)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(documents.router, prefix="/documents", tags=["Documents"])
@@ -12,9 +12,12 @@ class VisualReference(BaseModel):
     type: str
     page: int
     caption: Optional[str] = None
+    bbox: Optional[List[float]] = None
 
 class SearchResult(BaseModel):
     document_id: str
+    document_title: Optional[str] = None
+    pdf_link: Optional[str] = None
     content: str
     relevance_score: float
     source_type: str
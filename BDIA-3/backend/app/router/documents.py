@@ -1,21 +1,89 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from ..models.document import Document, DocumentSummary
 from ..services.snowflake_service import SnowflakeService
 from ..services.summarization_service import SummarizationService
 from ..services.auth_service import AuthService
 from ..services.nemo_multimodal_service import NeMoMultimodalService
+from ..services.inference_executor import InferenceQueueFullError
+from ..services.visual_index_service import VisualIndexService
+from ..services.streaming import sse_stream
+import csv
+import io
+import json
 
 router = APIRouter()
 snowflake_service = SnowflakeService()
 summarization_service = SummarizationService()
 nemo_service = NeMoMultimodalService()
+visual_index_service = VisualIndexService(nemo_service)
 
 
+def _parse_columns(columns: Optional[str]) -> Optional[List[str]]:
+    return [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+
+@router.get("")
+async def list_documents(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    order: str = "id",
+    columns: Optional[str] = None,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """One page of the document catalog; pass next_cursor back to get the following page"""
+    try:
+        return await snowflake_service.get_document_page(
+            limit=limit,
+            cursor=cursor,
+            order=order,
+            columns=_parse_columns(columns)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/export")
+async def export_documents(
+    format: str = Query("jsonl", pattern="^(jsonl|csv)$"),
+    columns: Optional[str] = None,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Stream the full catalog as JSON lines or CSV without buffering it in memory"""
+    selected = _parse_columns(columns)
+    try:
+        # Validate the projection before the response starts
+        snowflake_service.project_columns(selected, "id")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def rows():
+        header_written = False
+        async for table in snowflake_service.export_documents(selected):
+            records = table.to_pylist()
+            if format == "jsonl":
+                yield "".join(json.dumps(record, default=str) + "\n" for record in records)
+                continue
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(table.column_names)
+                header_written = True
+            writer.writerows([record[name] for name in table.column_names] for record in records)
+            yield buffer.getvalue()
+
+    media_type = "application/x-ndjson" if format == "jsonl" else "text/csv"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=documents.{format}"}
+    )
 
 @router.post("/{document_id}/summary", response_model=DocumentSummary)
 async def generate_document_summary(
     document_id: str,
+    background_tasks: BackgroundTasks,
     current_user = Depends(AuthService.get_current_user)
 ):
     """Generate a summary for a specific document"""
@@ -27,7 +95,8 @@ async def generate_document_summary(
 
         # Generate summary
         summary_result = await summarization_service.generate_document_summary(
-            pdf_path=document.pdf_link
+            pdf_path=document.pdf_link,
+            document_id=document_id
         )
 
         # Store summary in database
@@ -35,6 +104,8 @@ async def generate_document_summary(
             document_id=document_id,
             summary=summary_result["summary"]
         )
+        # First processing of a document also indexes its figures and tables
+        background_tasks.add_task(visual_index_service.ensure_index, document)
 
         return {
             "document_id": document_id,
@@ -69,6 +140,70 @@ async def generate_research_summary(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@router.post("/{document_id}/summary/stream")
+async def stream_document_summary(
+    document_id: str,
+    background_tasks: BackgroundTasks,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Stream a document summary as server-sent events"""
+    try:
+        document = await snowflake_service.get_document(document_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    summary_result = {}
+    background_tasks.add_task(visual_index_service.ensure_index, document)
+
+    async def store_summary(summary: str):
+        await snowflake_service.update_document_summary(
+            document_id=document_id,
+            summary=summary
+        )
+        return {"document_id": document_id, "metadata": summary_result.get("metadata", {})}
+
+    return StreamingResponse(
+        sse_stream(
+            summarization_service.stream_document_summary(
+                pdf_path=document.pdf_link,
+                result=summary_result
+            ),
+            on_complete=store_summary
+        ),
+        media_type="text/event-stream",
+        background=background_tasks
+    )
+
+@router.post("/{document_id}/research-summary/stream")
+async def stream_research_summary(
+    document_id: str,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Stream a research summary from Q&A interactions as server-sent events"""
+    try:
+        qa_interactions = await snowflake_service.get_document_qa_interactions(document_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def store_summary(research_summary: str):
+        await snowflake_service.store_research_summary(
+            document_id=document_id,
+            summary=research_summary
+        )
+        return {"document_id": document_id}
+
+    return StreamingResponse(
+        sse_stream(
+            summarization_service.stream_research_note_summary(qa_interactions=qa_interactions),
+            on_complete=store_summary
+        ),
+        media_type="text/event-stream"
+    )
+    
 @router.post("/{document_id}/multimodal-summary")
 async def generate_multimodal_summary(
     document_id: str,
@@ -91,5 +226,32 @@ async def generate_multimodal_summary(
         )
         
         return summary_result
+    except InferenceQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{document_id}/visual-index")
+async def build_visual_index(
+    document_id: str,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Detect and index figures and tables for a document"""
+    try:
+        document = await snowflake_service.get_document(document_id)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        elements = await visual_index_service.index_document(document)
+
+        return {
+            "document_id": document_id,
+            "visual_elements": [
+                {key: value for key, value in element.items() if key != "embedding"}
+                for element in elements
+            ]
+        }
+    except InferenceQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 #from ..services.nemo_service import NeMoService
 from ..services.nemo_multimodal_service import NeMoMultimodalService
+from ..services.inference_executor import InferenceQueueFullError
 from ..services.auth_service import AuthService
 from ..services.snowflake_service import SnowflakeService
 from ..services.research_notes_service import ResearchNotesService
 from ..services.vector_store_service import VectorStoreService
+from ..services.visual_index_service import VisualIndexService
+from ..services.semantic_answer_cache import get_semantic_answer_cache
+from ..services.streaming import sse_stream
 from datetime import datetime
+from typing import Dict
 
 from ..models.qa import QuestionRequest, Answer
 
@@ -15,6 +21,63 @@ nemo_service = NeMoMultimodalService()
 vector_store_service=VectorStoreService()
 notes_service=ResearchNotesService()
 snowflake_service=SnowflakeService()
+visual_index_service=VisualIndexService(nemo_service)
+answer_cache=get_semantic_answer_cache()
+
+
+async def _answer_question(request: QuestionRequest) -> Dict:
+    """NeMo answer for a question, shared by the plain and streamed endpoints"""
+    # Reuse the answer to a near-identical earlier question about this document
+    question_embedding = await nemo_service.encode_text(request.question)
+    cached = answer_cache.lookup(request.document_id, question_embedding, namespace="qa")
+    if cached:
+        # A cache hit is still a question asked about the document
+        await snowflake_service.log_qa_interaction(
+            request.document_id, request.question, cached["answer"]["answer"]
+        )
+        return cached["answer"]
+    
+    # Get document metadata and relevant chunks only
+    document_chunks = await vector_store_service.get_relevant_chunks(
+        document_id=request.document_id,
+        query=request.question
+    )
+    
+    # Process with NeMo
+    response = await nemo_service.process_multimodal_query(
+        query=request.question,
+        context=document_chunks
+    )
+    
+    # Generate research note
+    research_note = await nemo_service.generate_research_note({
+        "question": request.question,
+        "answer": response.answer,
+        "references": response.references
+    })
+    
+    # Store for validation
+    await notes_service.create_pending_note(
+        document_id=request.document_id,
+        content=research_note,
+        metadata=response.metadata
+    )
+    
+    answer = {
+        "answer": response.answer,
+        "confidence_score": response.confidence,
+        "source_references": response.references,
+        "generated_at": datetime.now()
+    }
+    answer_cache.store(
+        request.document_id,
+        request.question,
+        question_embedding,
+        answer,
+        namespace="qa"
+    )
+    await snowflake_service.log_qa_interaction(request.document_id, request.question, response.answer)
+    return answer
 
 
 @router.post("/ask", response_model=Answer)
@@ -24,46 +87,49 @@ async def process_question(
 ):
     """Process question using multi-modal RAG"""
     try:
-        # Get document metadata and relevant chunks only
-        document_chunks = await vector_store_service.get_relevant_chunks(
-            document_id=request.document_id,
-            query=request.question
-        )
-        
-        # Process with NeMo
-        response = await nemo_service.process_multimodal_query(
-            query=request.question,
-            context=document_chunks
-        )
-        
-        # Generate research note
-        research_note = await nemo_service.generate_research_note({
-            "question": request.question,
-            "answer": response.answer,
-            "references": response.references
-        })
-        
-        # Store for validation
-        await notes_service.create_pending_note(
-            document_id=request.document_id,
-            content=research_note,
-            metadata=response.metadata
-        )
-        
-        return {
-            "answer": response.answer,
-            "confidence_score": response.confidence,
-            "source_references": response.references,
-            "generated_at": datetime.now()
-        }
+        return await _answer_question(request)
+    except InferenceQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ask/stream")
+async def stream_question(
+    request: QuestionRequest,
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Stream the answer to a question as server-sent events.
+
+    Runs the same NeMo pipeline as /ask. The model produces the answer in one
+    pass, so it arrives as a single token; the done event carries the
+    confidence score and source references.
+    """
+    answer = {}
+
+    async def answer_tokens():
+        answer.update(await _answer_question(request))
+        yield answer["answer"]
+
+    async def answer_metadata(_: str):
+        return {
+            "document_id": request.document_id,
+            "confidence_score": answer["confidence_score"],
+            "source_references": answer["source_references"],
+            "generated_at": answer["generated_at"]
+        }
+
+    return StreamingResponse(
+        sse_stream(answer_tokens(), on_complete=answer_metadata),
+        media_type="text/event-stream"
+    )
+
+
 @router.post("/multimodal-query")
 async def process_multimodal_query(
     document_id: str,
     query: str,
+    background_tasks: BackgroundTasks,
     include_visual: bool = True,
     current_user = Depends(AuthService.get_current_user)
 ):
@@ -77,18 +143,27 @@ async def process_multimodal_query(
         # Process visual content if requested
         visual_content = None
         if include_visual:
-            if document.image_link:
+            indexed_elements = await visual_index_service.get_visual_elements(document.id)
+            if indexed_elements:
+                visual_content = nemo_service.visual_content_from_elements(indexed_elements)
+            elif document.image_link:
                 visual_content = await nemo_service.process_image(document.image_link)
             elif document.pdf_link:
-                visual_content = await nemo_service.process_pdf(document.pdf_link)
+                # Index now so later queries skip the vision model
+                background_tasks.add_task(visual_index_service.ensure_index, document)
+                pages = await nemo_service.process_pdf(document.pdf_link)
+                visual_content = pages[0] if pages else None
         
         # Process query
         response = await nemo_service.query_document(
             query=query,
-            document=document,
-            visual_content=visual_content
+            document_content=document.summary or document.title,
+            visual_content=visual_content,
+            document_id=document.id
         )
         
         return response
+    except InferenceQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -2,11 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, List
 from ..models.document import Document
 from ..services.report_generation_service import ReportGenerationService
+from ..services.snowflake_service import SnowflakeService
 from ..services.auth_service import AuthService
 from datetime import datetime
 
 router = APIRouter()
 report_service = ReportGenerationService()
+snowflake_service = SnowflakeService()
 
 @router.post("/generate/{document_id}")
 async def generate_document_report(
@@ -3,10 +3,12 @@ from typing import List, Optional
 from datetime import datetime
 from ..models.research_note import ResearchNote, ResearchNoteCreate
 from ..services.vector_store_service import VectorStoreService
+from ..services.research_notes_service import ResearchNotesService
 from ..services.auth_service import AuthService
 
 router = APIRouter()
 vector_store = VectorStoreService()
+notes_service = ResearchNotesService()
 
 @router.post("/notes/{document_id}")
 async def add_research_note(
@@ -16,7 +18,7 @@ async def add_research_note(
 ):
     """Add a new research note to the document index"""
     try:
-        timestamp = datetime.now()
+        timestamp = datetime.utcnow()
         await vector_store.add_research_note(
             document_id=document_id,
             note=note.content,
@@ -34,6 +36,20 @@ async def get_document_notes(
     """Retrieve all research notes for a document"""
     return await vector_store.get_research_notes(document_id)
 
+@router.get("/notes/{document_id}/trends")
+async def get_note_trends(
+    document_id: str,
+    time_range: str = "1w",
+    current_user = Depends(AuthService.get_current_user)
+):
+    """Note volume and topic drift over a time range like 1d, 2w, 3m or 1y"""
+    try:
+        return await notes_service.analyze_notes_trend(document_id, time_range=time_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/search")
 async def search_content(
     query: str,
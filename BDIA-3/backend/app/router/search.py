@@ -9,14 +9,21 @@ from ..models.search import (
 )
 from ..services.search_service import SearchService
 from ..services.auth_service import AuthService
+from ..services.vector_store_service import VectorStoreService
+from ..services.nemo_multimodal_service import NeMoMultimodalService
+from ..services.research_notes_service import ResearchNotesService
 
 router = APIRouter()
+search_service = SearchService(VectorStoreService(), NeMoMultimodalService(), ResearchNotesService())
+
+def get_search_service() -> SearchService:
+    return search_service
 
 @router.post("/hybrid", response_model=SearchResponse)
 async def hybrid_search(
     request: SearchRequest,
     current_user = Depends(AuthService.get_current_user),
-    search_service: SearchService = Depends()
+    search_service: SearchService = Depends(get_search_service)
 ):
     """Perform hybrid search across documents and research notes"""
     try:
@@ -35,7 +42,7 @@ async def find_similar_notes(
     note_id: str,
     limit: int = 5,
     current_user = Depends(AuthService.get_current_user),
-    search_service: SearchService = Depends()
+    search_service: SearchService = Depends(get_search_service)
 ):
     """Find similar research notes"""
     try:
@@ -55,7 +62,7 @@ async def search_by_time_range(
     page: int = 1,
     page_size: int = 10,
     current_user = Depends(AuthService.get_current_user),
-    search_service: SearchService = Depends()
+    search_service: SearchService = Depends(get_search_service)
 ):
     """Search within a specific time range"""
     try:
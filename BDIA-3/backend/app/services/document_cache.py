@@ -0,0 +1,202 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+import time
+from app.config.settings import settings
+from ..models.document import Document
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_SUPPORT = True
+except ImportError:
+    REDIS_SUPPORT = False
+
+
+class DocumentCache:
+    """Read-through cache for document rows.
+
+    Entries live in an in-process LRU for ``ttl`` seconds. When a Redis URL
+    is configured, a shared tier sits behind it so every worker reuses one
+    warehouse read; the local tier then keeps entries only for ``local_ttl``
+    seconds, which bounds how long another worker's write can go unseen.
+    Shared keys include the catalog version, so a pipeline reload retires
+    every worker's entries at once.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_entries: int = 10000,
+        redis_url: Optional[str] = None,
+        local_ttl: Optional[float] = None,
+        version_check_interval: float = 30
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check_interval = version_check_interval
+        self._shared = None
+        if redis_url and REDIS_SUPPORT:
+            self._shared = redis_asyncio.from_url(redis_url)
+        elif redis_url:
+            print("Warning: redis not installed; document cache is process-local only")
+        self.local_ttl = local_ttl if self._shared is not None and local_ttl is not None else ttl
+        # document_id -> (document, expires at)
+        self._local: "OrderedDict[str, Tuple[Document, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._version_checked_at = float("-inf")
+        # Bumped by every invalidation so a read that raced a write is not cached
+        self._epoch = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def version_check_due(self) -> bool:
+        """True at most once per interval; the caller then reports the version"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._version_checked_at < self.version_check_interval:
+                return False
+            self._version_checked_at = now
+            return True
+
+    def set_version(self, version: Optional[str]):
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._local.clear()
+                self._epoch += 1
+
+    async def get(self, document_id: str) -> Optional[Document]:
+        with self._lock:
+            entry = self._local.get(document_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._local.move_to_end(document_id)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._local[document_id]
+
+        if self._shared is not None:
+            try:
+                payload = await self._shared.get(self._shared_key(document_id))
+            except Exception as e:
+                print(f"Warning: shared document cache read failed: {str(e)}")
+                payload = None
+            if payload:
+                document = Document.model_validate_json(payload)
+                self._store_local(document_id, document)
+                with self._lock:
+                    self._hits += 1
+                return document
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    async def get_many(self, document_ids: List[str]) -> Dict[str, Document]:
+        """Cached documents among ``document_ids``; the shared tier is read in one round trip"""
+        found: Dict[str, Document] = {}
+        missing: List[str] = []
+        now = time.monotonic()
+        with self._lock:
+            for document_id in document_ids:
+                entry = self._local.get(document_id)
+                if entry is not None and entry[1] > now:
+                    self._local.move_to_end(document_id)
+                    found[document_id] = entry[0]
+                else:
+                    missing.append(document_id)
+
+        if missing and self._shared is not None:
+            try:
+                payloads = await self._shared.mget([self._shared_key(document_id) for document_id in missing])
+            except Exception as e:
+                print(f"Warning: shared document cache read failed: {str(e)}")
+                payloads = [None] * len(missing)
+            for document_id, payload in zip(missing, payloads):
+                if payload:
+                    document = Document.model_validate_json(payload)
+                    self._store_local(document_id, document)
+                    found[document_id] = document
+
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(document_ids) - len(found)
+        return found
+
+    async def set(self, document_id: str, document: Document, epoch: Optional[int] = None):
+        """Cache a freshly read row unless an invalidation happened since ``epoch``"""
+        if epoch is not None and epoch != self._epoch:
+            return
+        self._store_local(document_id, document)
+        if self._shared is not None:
+            try:
+                await self._shared.set(
+                    self._shared_key(document_id),
+                    document.model_dump_json(),
+                    ex=int(self.ttl)
+                )
+            except Exception as e:
+                print(f"Warning: shared document cache write failed: {str(e)}")
+
+    async def set_many(self, documents: Dict[str, Document], epoch: Optional[int] = None):
+        """Cache many freshly read rows; the shared tier is written in one pipelined round trip"""
+        if not documents or (epoch is not None and epoch != self._epoch):
+            return
+        for document_id, document in documents.items():
+            self._store_local(document_id, document)
+        if self._shared is not None:
+            try:
+                async with self._shared.pipeline(transaction=False) as pipe:
+                    for document_id, document in documents.items():
+                        pipe.set(self._shared_key(document_id), document.model_dump_json(), ex=int(self.ttl))
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Warning: shared document cache write failed: {str(e)}")
+
+    async def invalidate(self, document_id: str):
+        with self._lock:
+            self._local.pop(document_id, None)
+            self._epoch += 1
+        if self._shared is not None:
+            try:
+                await self._shared.delete(self._shared_key(document_id))
+            except Exception as e:
+                print(f"Warning: shared document cache delete failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._local),
+                "hits": self._hits,
+                "misses": self._misses,
+                "catalog_version": self._version,
+                "shared": self._shared is not None
+            }
+
+    def _store_local(self, document_id: str, document: Document):
+        with self._lock:
+            self._local[document_id] = (document, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(document_id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _shared_key(self, document_id: str) -> str:
+        return f"document:{self._version or 'none'}:{document_id}"
+
+
+@lru_cache()
+def get_document_cache() -> DocumentCache:
+    """Process-wide cache shared by every SnowflakeService instance"""
+    return DocumentCache(
+        ttl=settings.DOCUMENT_CACHE_TTL_SECONDS,
+        max_entries=settings.DOCUMENT_CACHE_MAX_ENTRIES,
+        redis_url=settings.DOCUMENT_CACHE_REDIS_URL or None,
+        local_ttl=settings.DOCUMENT_CACHE_LOCAL_TTL_SECONDS,
+        version_check_interval=settings.CATALOG_VERSION_CHECK_SECONDS
+    )
@@ -0,0 +1,144 @@
+from typing import Any, List, Optional
+import asyncio
+from pathlib import Path
+import numpy as np
+from llama_index.bridge.pydantic import Field, PrivateAttr
+from llama_index.embeddings import HuggingFaceEmbedding
+from llama_index.embeddings.base import BaseEmbedding
+from app.config.settings import Settings
+
+BGE_QUERY_INSTRUCTION = "Represent this sentence for searching relevant passages: "
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+
+class ONNXEmbedding(BaseEmbedding):
+    """BGE-style sentence embeddings served by ONNX Runtime.
+
+    Expects a directory holding the exported model (optionally int8
+    quantized, see ``export_onnx_model``) and its tokenizer files.
+    """
+
+    model_dir: str = Field(description="Directory with the ONNX model and tokenizer")
+    max_length: int = Field(default=512)
+    query_instruction: str = Field(default=BGE_QUERY_INSTRUCTION)
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: List[str] = PrivateAttr()
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        embed_batch_size: int = 32,
+        max_length: int = 512,
+        intra_op_threads: int = 0,
+        **kwargs: Any
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = Path(model_dir) / (ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(f"ONNX model not found: {model_file}")
+
+        super().__init__(
+            model_dir=model_dir,
+            embed_batch_size=embed_batch_size,
+            max_length=max_length,
+            model_name=model_file.name,
+            **kwargs
+        )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self._session = ort.InferenceSession(
+            str(model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self._input_names = [model_input.name for model_input in self._session.get_inputs()]
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ONNXEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        encoded = self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        inputs = {
+            name: encoded[name].astype(np.int64)
+            for name in self._input_names if name in encoded
+        }
+        hidden_state = self._session.run(None, inputs)[0]
+        # BGE uses the normalised [CLS] token as the sentence embedding
+        cls_embeddings = hidden_state[:, 0]
+        norms = np.linalg.norm(cls_embeddings, axis=1, keepdims=True)
+        return (cls_embeddings / np.clip(norms, 1e-12, None)).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([self.query_instruction + query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    # The async hooks run the forward pass in the default executor instead of on the event loop
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._embed, texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aembed([self.query_instruction + query]))[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aembed([text]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts)
+
+
+def get_embed_model(settings: Optional[Settings] = None) -> BaseEmbedding:
+    """Embedding model for the configured backend, falling back to the local HF model"""
+    settings = settings or Settings()
+    if settings.EMBED_BACKEND == "onnx":
+        try:
+            return ONNXEmbedding(
+                model_dir=settings.EMBED_ONNX_PATH,
+                quantized=settings.EMBED_ONNX_QUANTIZED,
+                embed_batch_size=settings.EMBED_BATCH_SIZE
+            )
+        except (ImportError, OSError) as e:
+            print(f"Warning: ONNX embedding backend unavailable, using {settings.EMBED_MODEL_NAME}: {str(e)}")
+
+    return HuggingFaceEmbedding(
+        model_name=settings.EMBED_MODEL_NAME,
+        embed_batch_size=settings.EMBED_BATCH_SIZE
+    )
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Path:
+    """Export a Hugging Face encoder to ONNX and optionally add an int8 quantized copy"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoTokenizer
+
+    output_path = Path(output_dir)
+    ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(output_path)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_path)
+    if quantize:
+        quantize_dynamic(
+            str(output_path / ONNX_MODEL_FILE),
+            str(output_path / ONNX_QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+    return output_path
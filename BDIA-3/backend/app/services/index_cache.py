@@ -0,0 +1,81 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import threading
+
+
+def path_size(path: Path) -> int:
+    """On-disk size of a file or directory, used as the in-memory size estimate"""
+    if path.is_dir():
+        return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+class IndexCache:
+    """LRU cache of loaded indices bounded by total byte size.
+
+    Pinned keys are never evicted; if pinned entries alone exceed the budget
+    the cache simply holds them and evicts everything else.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._pinned: Set[str] = set()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            self._evict()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def pin(self, key: str):
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key: str):
+        with self._lock:
+            self._pinned.discard(key)
+            self._evict()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "pinned": sorted(self._pinned),
+                "hits": self._hits,
+                "misses": self._misses
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def _evict(self):
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key not in self._pinned:
+                self._remove(key)
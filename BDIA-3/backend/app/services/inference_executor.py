@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import torch
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict
+from ..config.nemo_config import nemo_config
+
+
+class InferenceQueueFullError(Exception):
+    """Raised when the inference queue cannot accept more work"""
+
+
+class InferenceExecutor:
+    """Bounded thread pool for blocking model calls.
+
+    Torch releases the GIL inside its kernels, so running inference on worker
+    threads keeps the event loop free for auth, health checks and I/O. Calls
+    run under ``torch.inference_mode`` so no autograd state is recorded.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue_size: int = 32):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="nemo-inference"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=100)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the inference pool, rejecting when the queue is full"""
+        with self._lock:
+            if self._queued >= self.max_queue_size:
+                self._rejected += 1
+                raise InferenceQueueFullError(
+                    f"Inference queue is full ({self._queued} requests waiting)"
+                )
+            self._queued += 1
+
+        submitted_at = time.perf_counter()
+        job = self._pool.submit(
+            self._execute,
+            submitted_at,
+            partial(func, *args, **kwargs)
+        )
+        # A caller cancelled before the job started cancels the job too, so
+        # _execute never runs to take it off the queue
+        job.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(job)
+
+    def _release_cancelled(self, job: Future):
+        if job.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _execute(self, submitted_at: float, call: Callable) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_times.append(time.perf_counter() - submitted_at)
+        try:
+            with torch.inference_mode():
+                return call()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict:
+        """Current queue depth and recent wait times"""
+        with self._lock:
+            waits = list(self._wait_times)
+            return {
+                "queue_depth": self._queued,
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": (sum(waits) / len(waits) * 1000) if waits else 0.0,
+                "max_wait_ms": max(waits) * 1000 if waits else 0.0
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+@lru_cache()
+def get_inference_executor() -> InferenceExecutor:
+    """Process-wide executor shared by every NeMo service instance"""
+    return InferenceExecutor(
+        max_workers=nemo_config.INFERENCE_WORKERS,
+        max_queue_size=nemo_config.INFERENCE_MAX_QUEUE
+    )
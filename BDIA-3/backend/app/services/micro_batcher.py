@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+
+class MicroBatcher:
+    """Collect concurrent single-item requests into one batched call.
+
+    Callers await ``submit(item)``. While a batch is already running, new items
+    wait up to ``max_wait_ms`` (or until ``max_batch_size`` items arrive) and
+    go out together; when nothing is in flight the request is dispatched
+    immediately so single-request latency is unaffected.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[Sequence[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        self._dispatches: Set[asyncio.Task] = set()
+        self._in_flight = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its row of the batched result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain_into(batch)
+
+            if self._in_flight:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                    self._drain_into(batch)
+
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if batch:
+                self._in_flight += 1
+                task = loop.create_task(self._dispatch(batch))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+
+    def _drain_into(self, batch: List[Tuple[Any, asyncio.Future]]):
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= 1
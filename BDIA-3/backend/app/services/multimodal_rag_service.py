@@ -1,20 +1,45 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
+import asyncio
 import torch
 from datetime import datetime
 from pathlib import Path
-import tempfile
+import re
 from PIL import Image
-from pdf2image import convert_from_path
 from llama_index import VectorStoreIndex, ServiceContext, Document as LlamaDocument
 from llama_index.multi_modal_llms import NvidiaMultiModalLLM
 from llama_index.multi_modal_llms.nvidia import NVIDIAMultiModalConfig
-from llama_index.schema import ImageNode, TextNode, NodeRelationship
+from llama_index.schema import ImageNode, TextNode, NodeRelationship, QueryBundle
+from llama_index.vector_stores.types import ExactMatchFilter, MetadataFilters
 from  app.config.settings import Settings
 from ..models.document import Document
+from .index_cache import IndexCache, path_size
+from .nemo_multimodal_service import NeMoMultimodalService
+from .pdf_text_extractor import PDFTextExtractor
+from .embedding_backends import get_embed_model
+from .semantic_answer_cache import get_semantic_answer_cache
+from .single_flight import get_single_flight
+
+# Questions about visual elements still go through image retrieval
+FIGURE_QUERY_PATTERN = re.compile(
+    r"\b(figure|fig\.|chart|graph|table|exhibit|image|diagram|plot|visual)s?\b",
+    re.IGNORECASE
+)
+# Resolution of the page images indexed for figure questions
+PAGE_RENDER_DPI = 200
 
 class MultiModalRAGService:
+    # Loaded indices are shared by every service instance in the process
+    _index_cache: Optional[IndexCache] = None
+    # Bumped by every save, so a disk load that started earlier cannot replace the saved index
+    _index_generations: Dict[str, int] = {}
+
     def __init__(self):
         self.settings = Settings()
+        if MultiModalRAGService._index_cache is None:
+            MultiModalRAGService._index_cache = IndexCache(self.settings.INDEX_CACHE_MAX_BYTES)
+            for document_id in filter(None, self.settings.INDEX_CACHE_PINNED.split(",")):
+                MultiModalRAGService._index_cache.pin(document_id.strip())
+        self.single_flight = get_single_flight()
         self.nvidia_config = NVIDIAMultiModalConfig(
             api_key=self.settings.NVIDIA_API_KEY,
             model_endpoint=self.settings.NVIDIA_MODEL_ENDPOINT
@@ -22,12 +47,19 @@ class MultiModalRAGService:
         self.llm = NvidiaMultiModalLLM(config=self.nvidia_config)
         self.service_context = ServiceContext.from_defaults(
             llm=self.llm,
-            embed_model="local:BAAI/bge-large-en-v1.5"
+            embed_model=get_embed_model(self.settings)
         )
+        self.text_extractor = PDFTextExtractor(chunk_size=1000, chunk_overlap=200)
+        self.answer_cache = get_semantic_answer_cache()
         
     async def _create_nodes(self, document: Document) -> List[Union[TextNode, ImageNode]]:
         """Create nodes from document content"""
+        # Image decoding, text extraction and page rendering are blocking, so they run off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self._build_nodes, document)
+
+    def _build_nodes(self, document: Document) -> List[Union[TextNode, ImageNode]]:
         nodes = []
+        text_node = None
         
         # Process text content
         if document.summary:
@@ -35,7 +67,8 @@ class MultiModalRAGService:
                 text=document.summary,
                 metadata={
                     "document_id": document.id,
-                    "type": "summary"
+                    "type": "summary",
+                    "modality": "text"
                 }
             )
             nodes.append(text_node)
@@ -49,37 +82,57 @@ class MultiModalRAGService:
                     metadata={
                         "document_id": document.id,
                         "type": "cover_image",
+                        "modality": "image",
                         "page_number": 1
                     }
                 )
                 nodes.append(image_node)
                 
                 # Create relationship between text and image
-                if nodes:
-                    NodeRelationship.from_nodes(
-                        parent=text_node,
-                        child=image_node,
-                        relationship_type="image_context"
-                    )
+                if text_node is not None:
+                    text_node.relationships[NodeRelationship.CHILD] = [image_node.as_related_node_info()]
+                    image_node.relationships[NodeRelationship.PARENT] = text_node.as_related_node_info()
             except Exception as e:
                 print(f"Error processing image: {str(e)}")
                 
-        # Process PDF
+        # Process PDF one page at a time: a page image node plus text nodes for its chunks.
+        # Pages are rendered from the document already open for text, not re-parsed per page.
         if document.pdf_link:
             try:
-                # Convert PDF pages to images
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    images = convert_from_path(document.pdf_link)
-                    for idx, image in enumerate(images, 1):
-                        image_node = ImageNode(
-                            image=image,
+                for page_number, chunks, image in self.text_extractor.iter_rendered_pages(
+                    document.pdf_link, dpi=PAGE_RENDER_DPI
+                ):
+                    page_node = ImageNode(
+                        image=image,
+                        metadata={
+                            "document_id": document.id,
+                            "type": "pdf_page",
+                            "modality": "image",
+                            "page_number": page_number
+                        }
+                    )
+                    nodes.append(page_node)
+                    
+                    chunk_nodes = []
+                    for chunk in chunks:
+                        chunk_node = TextNode(
+                            text=chunk.text,
                             metadata={
                                 "document_id": document.id,
-                                "type": "pdf_page",
-                                "page_number": idx
+                                "type": "pdf_text",
+                                "modality": "text",
+                                "page_number": page_number,
+                                "chunk_index": chunk.chunk_index,
+                                "page_node_id": page_node.node_id
                             }
                         )
-                        nodes.append(image_node)
+                        chunk_node.relationships[NodeRelationship.PARENT] = page_node.as_related_node_info()
+                        chunk_nodes.append(chunk_node)
+                    if chunk_nodes:
+                        page_node.relationships[NodeRelationship.CHILD] = [
+                            chunk_node.as_related_node_info() for chunk_node in chunk_nodes
+                        ]
+                    nodes.extend(chunk_nodes)
             except Exception as e:
                 print(f"Error processing PDF: {str(e)}")
                 
@@ -118,13 +171,34 @@ class MultiModalRAGService:
             if not index:
                 raise Exception(f"Document index not found for ID: {document_id}")
             
-            # Create query engine
-            query_engine = index.as_query_engine(
-                service_context=self.service_context
-            )
+            # Near-identical questions about the same document reuse the cached answer;
+            # answers grounded in a query-specific image are never cached
+            has_image_context = bool(context and context.get('image'))
+            query_embedding = None
+            if not has_image_context:
+                query_embedding = await self.service_context.embed_model.aget_query_embedding(query)
+                cached = self.answer_cache.lookup(document_id, query_embedding, namespace="rag")
+                if cached:
+                    return {
+                        **cached["answer"],
+                        "cached": True,
+                        "matched_question": cached["matched_question"]
+                    }
+            
+            # Plain text questions are answered from text nodes only;
+            # image retrieval is reserved for questions about figures
+            if has_image_context or FIGURE_QUERY_PATTERN.search(query):
+                query_engine = index.as_query_engine(
+                    service_context=self.service_context
+                )
+            else:
+                query_engine = index.as_query_engine(
+                    service_context=self.service_context,
+                    filters=MetadataFilters(filters=[ExactMatchFilter(key="modality", value="text")])
+                )
             
             # Process query with context if provided
-            if context and context.get('image'):
+            if has_image_context:
                 image_context = ImageNode(
                     image=context['image'],
                     metadata={"type": "query_context"}
@@ -134,31 +208,67 @@ class MultiModalRAGService:
                     image_nodes=[image_context]
                 )
             else:
-                response = query_engine.query(query)
+                # Reuse the cache lookup's embedding so retrieval does not embed the question again
+                response = query_engine.query(QueryBundle(query_str=query, embedding=query_embedding))
             
-            return {
+            result = {
                 "answer": response.response,
                 "sources": response.source_nodes,
                 "metadata": response.metadata
             }
+            if query_embedding is not None:
+                self.answer_cache.store(document_id, query, query_embedding, result, namespace="rag")
+            return result
         except Exception as e:
             raise Exception(f"Error querying document: {str(e)}")
 
     async def get_document_index(self, document_id: str) -> Optional[VectorStoreIndex]:
-        """Retrieve document index from storage"""
+        """Retrieve document index, from the in-memory cache when possible"""
         try:
-            # Implementation depends on your storage solution
-            # This is a placeholder - implement based on your storage
-            index_path = Path(self.settings.VECTOR_STORE_PATH) / f"{document_id}.index"
-            if index_path.exists():
-                return VectorStoreIndex.load_from_disk(
-                    str(index_path),
-                    service_context=self.service_context
-                )
-            return None
+            index = self._index_cache.get(document_id)
+            if index is not None:
+                return index
+
+            # Concurrent misses share one disk load across every service instance.
+            # It runs as its own task, so a cancelled caller never strands the others.
+            generation = self._index_generations.get(document_id, 0)
+            return await self.single_flight.do(
+                "load_index",
+                document_id,
+                lambda: self._load_document_index(document_id, generation),
+                params={"generation": generation}
+            )
         except Exception as e:
             raise Exception(f"Error retrieving document index: {str(e)}")
 
+    async def _load_document_index(self, document_id: str, generation: int) -> Optional[VectorStoreIndex]:
+        index_path = Path(self.settings.VECTOR_STORE_PATH) / f"{document_id}.index"
+        index = await asyncio.get_running_loop().run_in_executor(
+            None, self._read_document_index, index_path
+        )
+        if index is None:
+            return None
+        if self._index_generations.get(document_id, 0) != generation:
+            # Saved while we were reading; the saved index is already cached
+            return self._index_cache.get(document_id) or index
+        self._index_cache.put(document_id, index, path_size(index_path))
+        return index
+
+    def _read_document_index(self, index_path: Path) -> Optional[VectorStoreIndex]:
+        if not index_path.exists():
+            return None
+        return VectorStoreIndex.load_from_disk(
+            str(index_path),
+            service_context=self.service_context
+        )
+
+    def pin_document(self, document_id: str):
+        """Keep a hot document's index in memory regardless of LRU pressure"""
+        self._index_cache.pin(document_id)
+
+    def unpin_document(self, document_id: str):
+        self._index_cache.unpin(document_id)
+
     async def save_document_index(self, document_id: str, index: VectorStoreIndex):
         """Save document index to storage"""
         try:
@@ -166,5 +276,10 @@ class MultiModalRAGService:
             index_path = Path(self.settings.VECTOR_STORE_PATH) / f"{document_id}.index"
             index_path.parent.mkdir(parents=True, exist_ok=True)
             index.save_to_disk(str(index_path))
+            self._index_generations[document_id] = self._index_generations.get(document_id, 0) + 1
+            # Replace any stale copy with the index just written
+            self._index_cache.put(document_id, index, path_size(index_path))
+            self.answer_cache.invalidate(document_id)
+            NeMoMultimodalService.invalidate_document_context(document_id)
         except Exception as e:
             raise Exception(f"Error saving document index: {str(e)}")
\ No newline at end of file
@@ -1,12 +1,19 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
 import torch
 import numpy as np
 from PIL import Image
 import nemo.collections.nlp as nemo_nlp
 import nemo.collections.multimodal as nemo_multimodal
-from ..config.nemo_config import nemo_config
+from ..config.nemo_config import NeMoConfig, nemo_config
+from ..models.document import Document
+from .inference_executor import get_inference_executor, InferenceQueueFullError
+from .micro_batcher import MicroBatcher
+from .page_salience import PageSalienceScorer
+from .single_flight import get_single_flight
 from pathlib import Path
-import tempfile
 import os
 import platform
 
@@ -18,75 +25,234 @@ except ImportError:
     print("Warning: pdf2image not installed. PDF processing will be limited.")
 
 class NeMoMultimodalService:
-    def __init__(self):
-        self.config = nemo_config
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # Document-side context embeddings keyed by (document, version, visual content hash),
+    # shared by every service instance so invalidation reaches all of them
+    _context_cache: "OrderedDict[Tuple, torch.Tensor]" = OrderedDict()
+    # One text batcher per process, so encode_text calls from every router share batches
+    _text_batcher: Optional[MicroBatcher] = None
+
+    def __init__(self, config: Optional[NeMoConfig] = None):
+        self.config = config or nemo_config
+        self.cpu_profile = self.config.INFERENCE_PROFILE == "cpu"
+        if self.cpu_profile:
+            self.device = torch.device("cpu")
+            self._configure_cpu_threads()
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.executor = get_inference_executor()
+        self.page_scorer = PageSalienceScorer(thumbnail_dpi=self.config.SALIENCE_THUMBNAIL_DPI)
+        self.single_flight = get_single_flight()
         
         # Initialize NeMo models
         try:
             self.multimodal_model = nemo_multimodal.models.MultiModalModel.from_pretrained(
                 self.config.NEMO_MODEL_PATH
             ).to(self.device)
+            self.multimodal_model.eval()
+            if self.cpu_profile:
+                self.multimodal_model = torch.quantization.quantize_dynamic(
+                    self.multimodal_model,
+                    {torch.nn.Linear},
+                    dtype=torch.qint8
+                )
         except Exception as e:
             print(f"Warning: Could not load NeMo model: {str(e)}")
             self.multimodal_model = None
 
-    def _convert_pdf_to_images(self, pdf_path: str) -> List[Image.Image]:
+        # The first instance with a loaded model runs the shared batches
+        if NeMoMultimodalService._text_batcher is None and self.multimodal_model is not None:
+            NeMoMultimodalService._text_batcher = MicroBatcher(
+                self._encode_text_batch,
+                max_batch_size=self.config.EMBED_BATCH_SIZE,
+                max_wait_ms=self.config.EMBED_BATCH_WAIT_MS
+            )
+
+    def _configure_cpu_threads(self):
+        """Split the available cores between inference workers"""
+        intra_op = self.config.CPU_INTRA_OP_THREADS or max(
+            1, (os.cpu_count() or 1) // self.config.INFERENCE_WORKERS
+        )
+        torch.set_num_threads(intra_op)
+        try:
+            torch.set_num_interop_threads(self.config.CPU_INTER_OP_THREADS)
+        except RuntimeError:
+            # Inter-op pool can only be sized once, before any parallel work ran
+            pass
+
+    def _convert_pdf_to_images(self, pdf_path: str, **kwargs) -> List[Image.Image]:
         """Convert PDF to images with proper Poppler configuration"""
         try:
             if platform.system() == "Windows":
                 poppler_path = os.getenv('POPPLER_PATH', r"C:\Program Files\poppler-23.11.0\Library\bin")
-                return convert_from_path(pdf_path, poppler_path=poppler_path)
+                return convert_from_path(pdf_path, poppler_path=poppler_path, **kwargs)
             else:
-                return convert_from_path(pdf_path)
+                return convert_from_path(pdf_path, **kwargs)
         except Exception as e:
             raise Exception(f"Error converting PDF: {str(e)}")
 
+    async def _encode_text_batch(self, texts: List[str]) -> torch.Tensor:
+        """Encode a batch of texts in one forward pass"""
+        return await self.executor.run(self.multimodal_model.encode_text, texts)
+
+    async def encode_text(self, text: str) -> torch.Tensor:
+        """Encode a single text, batched with concurrent callers"""
+        if NeMoMultimodalService._text_batcher is None:
+            raise Exception("Error encoding text: NeMo model is not loaded")
+        return await NeMoMultimodalService._text_batcher.submit(text)
+
+    async def process_query(self, query: str) -> torch.Tensor:
+        """Embed a search query"""
+        try:
+            return await self.encode_text(query)
+        except InferenceQueueFullError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error processing query: {str(e)}")
+
+    def _process_image_sync(self, image_path: str) -> Dict:
+        """Blocking image analysis, run on the inference executor"""
+        element = self._analyze_image_sync(Image.open(image_path))
+        element["source"] = image_path
+        return element
+
+    def _analyze_image_sync(self, image: Image.Image) -> Dict:
+        image_tensor = self.multimodal_model.preprocess_image(image).to(self.device)
+        
+        analysis = self.multimodal_model.analyze_image(image_tensor)
+        
+        return {
+            "type": "image",
+            "analysis": analysis,
+            "embedding": self.multimodal_model.encode_image(image_tensor)
+        }
+
+    def _render_pdf_pages(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[Tuple[int, Image.Image]]:
+        """Rasterise all (or the given 1-based) pages; blocking, run on the inference executor"""
+        if pages is None:
+            return list(enumerate(self._convert_pdf_to_images(pdf_path), 1))
+        return [
+            (page, self._convert_pdf_to_images(pdf_path, first_page=page, last_page=page)[0])
+            for page in pages
+        ]
+
+    def _embed_image_sync(self, image: Image.Image) -> torch.Tensor:
+        image_tensor = self.multimodal_model.preprocess_image(image).to(self.device)
+        return self.multimodal_model.encode_image(image_tensor)
+
+    async def embed_image(self, image: Image.Image) -> torch.Tensor:
+        """Embed an in-memory image (e.g. a cropped figure region)"""
+        return await self.executor.run(self._embed_image_sync, image)
+
+    def visual_content_from_elements(self, elements: List[Dict]) -> Optional[Dict]:
+        """Build query visual context from indexed visual elements without re-running vision"""
+        if not elements:
+            return None
+        embeddings = [torch.tensor(element["embedding"], device=self.device) for element in elements]
+        return {
+            "type": "visual_index",
+            "source": "|".join(element["id"] for element in elements),
+            "embedding": (
+                embeddings[0] if len(embeddings) == 1
+                else self.multimodal_model.combine_embeddings(embeddings)
+            )
+        }
+
     async def process_image(self, image_path: str) -> Dict:
         """Process and analyze image content"""
         try:
-            image = Image.open(image_path)
-            image_tensor = self.multimodal_model.preprocess_image(image).to(self.device)
-            
-            analysis = self.multimodal_model.analyze_image(image_tensor)
-            
-            return {
-                "type": "image",
-                "analysis": analysis,
-                "embedding": self.multimodal_model.encode_image(image_tensor)
-            }
+            return await self.executor.run(self._process_image_sync, image_path)
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error processing image: {str(e)}")
 
-    async def process_pdf(self, pdf_path: str) -> List[Dict]:
-        """Process PDF and extract visual elements"""
+    async def process_pdf(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[Dict]:
+        """Process PDF and extract visual elements, optionally for selected 1-based pages only"""
         try:
-            images = self._convert_pdf_to_images(pdf_path)
+            # Poppler rendering and image analysis both stay off the event loop
+            images = await self.executor.run(self._render_pdf_pages, pdf_path, pages)
             visual_elements = []
             
-            for idx, image in enumerate(images):
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                    image.save(tmp.name)
-                    element = await self.process_image(tmp.name)
-                    element["page"] = idx + 1
-                    visual_elements.append(element)
-                    os.unlink(tmp.name)
+            for page, image in images:
+                element = await self.executor.run(self._analyze_image_sync, image)
+                element["page"] = page
+                element["source"] = f"{pdf_path}#page={page}"
+                visual_elements.append(element)
                     
             return visual_elements
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
 
-    async def query_document(self, query: str, document_content: str, visual_content: Optional[Dict] = None) -> Dict:
+    async def get_context_embedding(
+        self,
+        document_content: str,
+        visual_content: Optional[Dict] = None,
+        document_id: Optional[str] = None,
+        document_version: Optional[str] = None
+    ) -> torch.Tensor:
+        """Document (and visual) context embedding, computed once per document version"""
+        version = document_version or hashlib.sha256(document_content.encode("utf-8")).hexdigest()
+        visual_key = self._visual_key(visual_content) if visual_content else None
+        cache_key = (document_id, version, visual_key)
+
+        if cache_key in self._context_cache:
+            self._context_cache.move_to_end(cache_key)
+            return self._context_cache[cache_key]
+
+        model = self.multimodal_model
+        context_embedding = await self.executor.run(model.encode_text, document_content)
+
+        if visual_content:
+            visual_embedding = visual_content.get("embedding")
+            if visual_embedding is None:
+                visual_embedding = await self.executor.run(model.encode_image, visual_content['image'])
+            context_embedding = model.combine_embeddings([context_embedding, visual_embedding])
+
+        self._context_cache[cache_key] = context_embedding
+        while len(self._context_cache) > self.config.CONTEXT_CACHE_SIZE:
+            self._context_cache.popitem(last=False)
+        return context_embedding
+
+    @staticmethod
+    def _visual_key(visual_content: Dict) -> str:
+        """Hash of the visual content itself, so re-rendered or re-indexed visuals miss the cache"""
+        if visual_content.get("image") is not None:
+            data = visual_content["image"].tobytes()
+        elif visual_content.get("embedding") is not None:
+            data = torch.as_tensor(visual_content["embedding"]).detach().cpu().numpy().tobytes()
+        else:
+            data = str(visual_content.get("source") or visual_content.get("page")).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def invalidate_document_context(cls, document_id: str):
+        """Drop cached context embeddings for a document (call when it is reprocessed)"""
+        for key in [key for key in cls._context_cache if key[0] == document_id]:
+            del cls._context_cache[key]
+
+    async def query_document(
+        self,
+        query: str,
+        document_content: str,
+        visual_content: Optional[Dict] = None,
+        document_id: Optional[str] = None,
+        document_version: Optional[str] = None
+    ) -> Dict:
         """Query document using multimodal RAG"""
         try:
-            query_embedding = self.multimodal_model.encode_text(query)
-            doc_embedding = self.multimodal_model.encode_text(document_content)
-            
-            if visual_content:
-                visual_embedding = self.multimodal_model.encode_image(visual_content['image'])
-                doc_embedding = self.multimodal_model.combine_embeddings([doc_embedding, visual_embedding])
+            model = self.multimodal_model
+            query_embedding = await self.encode_text(query)
+            doc_embedding = await self.get_context_embedding(
+                document_content,
+                visual_content=visual_content,
+                document_id=document_id,
+                document_version=document_version
+            )
             
-            response = self.multimodal_model.generate_answer(
+            response = await self.executor.run(
+                model.generate_answer,
                 query_embedding=query_embedding,
                 context_embedding=doc_embedding,
                 max_length=self.config.MAX_OUTPUT_LENGTH,
@@ -98,19 +264,48 @@ class NeMoMultimodalService:
                 "confidence": response['confidence'],
                 "references": response['references']
             }
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error querying document: {str(e)}")
 
-    async def generate_visual_summary(self, document: Dict) -> Dict:
+    async def generate_visual_summary(self, document: Document) -> Dict:
         """Generate summary incorporating visual elements"""
+        # Concurrent requests for the same document share one NeMo job
+        return await self.single_flight.do(
+            "visual_summary",
+            document.id,
+            lambda: self._generate_visual_summary(document),
+            params={
+                "image_link": document.image_link,
+                "pdf_link": document.pdf_link,
+                "top_k": self.config.VISUAL_SUMMARY_TOP_K
+            }
+        )
+
+    async def _generate_visual_summary(self, document: Document) -> Dict:
         try:
-            text_embedding = self.multimodal_model.encode_text(document.get("content", ""))
-            
             visual_content = None
-            if document.get("image_link"):
-                visual_content = await self.process_image(document["image_link"])
-            elif document.get("pdf_link"):
-                visual_content = await self.process_pdf(document["pdf_link"])
+            selected_pages = None
+            if document.image_link:
+                visual_content = await self.process_image(document.image_link)
+            elif document.pdf_link:
+                # Only the most chart/table-heavy pages go through the full model;
+                # scoring renders thumbnails, so it shares the inference executor
+                selected_pages = await self.executor.run(
+                    self.page_scorer.select_pages,
+                    document.pdf_link,
+                    self.config.VISUAL_SUMMARY_TOP_K
+                )
+                page_elements = await self.process_pdf(document.pdf_link, pages=selected_pages)
+                if len(page_elements) > 1:
+                    visual_content = {
+                        "embedding": self.multimodal_model.combine_embeddings(
+                            [element["embedding"] for element in page_elements]
+                        )
+                    }
+                elif page_elements:
+                    visual_content = page_elements[0]
             
             summary_prompt = (
                 "Generate a comprehensive summary of this document, "
@@ -120,10 +315,11 @@ class NeMoMultimodalService:
             
             summary_embedding = await self.generate_multimodal_embedding(
                 text=summary_prompt,
-                visual_content=visual_content[0] if isinstance(visual_content, list) else visual_content
+                visual_content=visual_content
             )
             
-            summary = self.multimodal_model.generate(
+            summary = await self.executor.run(
+                self.multimodal_model.generate,
                 query_embedding=summary_embedding,
                 max_length=self.config.MAX_OUTPUT_LENGTH * 2,
                 temperature=self.config.TEMPERATURE,
@@ -134,37 +330,44 @@ class NeMoMultimodalService:
             return {
                 "summary": summary,
                 "visual_elements_processed": bool(visual_content),
-                "source_document": document.get("id")
+                "pages_analyzed": selected_pages,
+                "source_document": document.id
             }
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating visual summary: {str(e)}")
 
     async def generate_multimodal_embedding(self, text: str, visual_content: Optional[Dict] = None) -> torch.Tensor:
         """Generate combined embedding from text and visual content"""
         try:
-            text_embedding = self.multimodal_model.encode_text(text)
+            text_embedding = await self.encode_text(text)
             
             if not visual_content:
                 return text_embedding
                 
             visual_embedding = visual_content.get("embedding")
-            if not visual_embedding:
+            if visual_embedding is None:
                 return text_embedding
                 
             return self.multimodal_model.combine_embeddings([text_embedding, visual_embedding])
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating multimodal embedding: {str(e)}")
 
     async def analyze_content_trend(self, contents: List[str]) -> Dict:
         """Analyze trends in content"""
         try:
-            embeddings = [self.multimodal_model.encode_text(content) for content in contents]
-            trend_analysis = self.multimodal_model.analyze_trends(embeddings)
+            embeddings = await self._encode_text_batch(contents)
+            trend_analysis = await self.executor.run(self.multimodal_model.analyze_trends, embeddings)
             
             return {
                 "trend_summary": trend_analysis.get("summary", ""),
                 "key_changes": trend_analysis.get("changes", []),
                 "confidence": trend_analysis.get("confidence", 0.0)
             }
+        except InferenceQueueFullError:
+            raise
         except Exception as e:
             raise Exception(f"Error analyzing content trend: {str(e)}")
\ No newline at end of file
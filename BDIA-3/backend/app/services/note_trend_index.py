@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+import os
+import pickle
+import numpy as np
+from app.config.settings import settings
+
+
+class WindowAggregate:
+    """Running count and embedding sum for one time bucket"""
+
+    __slots__ = ("count", "verified", "vector_sum")
+
+    def __init__(self, dim: int):
+        self.count = 0
+        self.verified = 0
+        self.vector_sum = np.zeros(dim, dtype=np.float32)
+
+    def add(self, embedding: np.ndarray, verified: bool):
+        self.count += 1
+        self.verified += int(verified)
+        self.vector_sum += embedding
+
+    def remove(self, embedding: np.ndarray, verified: bool):
+        self.count -= 1
+        self.verified -= int(verified)
+        self.vector_sum -= embedding
+
+
+class NoteTrendIndex:
+    """Rolling per-bucket aggregates of research note embeddings.
+
+    Notes are folded into fixed-size time buckets as they are added, so a
+    trend query only combines bucket sums for the requested window and never
+    touches the embedding model. All timestamps are UTC; naive datetimes are
+    taken to be UTC already.
+    """
+
+    def __init__(self, bucket_size: timedelta = timedelta(days=1)):
+        self.bucket_size = bucket_size
+        self._buckets: Dict[str, Dict[int, WindowAggregate]] = {}
+        # note_id -> (document_id, bucket, embedding, verified, timestamp)
+        self._notes: Dict[str, Tuple[str, int, np.ndarray, bool, datetime]] = {}
+
+    @staticmethod
+    def _as_utc(timestamp: datetime) -> datetime:
+        if timestamp.tzinfo is None:
+            return timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.astimezone(timezone.utc)
+
+    def _bucket_for(self, timestamp: datetime) -> int:
+        return int(self._as_utc(timestamp).timestamp() // self.bucket_size.total_seconds())
+
+    def _bucket_start(self, bucket: int) -> datetime:
+        return datetime.utcfromtimestamp(bucket * self.bucket_size.total_seconds())
+
+    def add_note(
+        self,
+        document_id: str,
+        note_id: str,
+        timestamp: datetime,
+        embedding: Sequence[float],
+        verified: bool = False
+    ):
+        """Fold a note embedding into its time bucket"""
+        if note_id in self._notes:
+            self.remove_note(note_id)
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        bucket = self._bucket_for(timestamp)
+        buckets = self._buckets.setdefault(document_id, {})
+        if bucket not in buckets:
+            buckets[bucket] = WindowAggregate(vector.shape[0])
+        buckets[bucket].add(vector, verified)
+        self._notes[note_id] = (document_id, bucket, vector, verified, timestamp)
+
+    def remove_note(self, note_id: str):
+        """Subtract a note from its bucket"""
+        entry = self._notes.pop(note_id, None)
+        if entry is None:
+            return
+        document_id, bucket, vector, verified, _ = entry
+        aggregate = self._buckets[document_id][bucket]
+        aggregate.remove(vector, verified)
+        if aggregate.count == 0:
+            del self._buckets[document_id][bucket]
+
+    def mark_verified(self, note_id: str):
+        """Record that a tracked note has been verified"""
+        entry = self._notes.get(note_id)
+        if entry is None or entry[3]:
+            return
+        document_id, bucket, vector, _, timestamp = entry
+        self._buckets[document_id][bucket].verified += 1
+        self._notes[note_id] = (document_id, bucket, vector, True, timestamp)
+
+    def get_note(self, note_id: str) -> Optional[Dict]:
+        """Document, original timestamp and verified flag of a tracked note"""
+        entry = self._notes.get(note_id)
+        if entry is None:
+            return None
+        return {"document_id": entry[0], "verified": entry[3], "timestamp": entry[4]}
+
+    def note_ids(self) -> Set[str]:
+        return set(self._notes)
+
+    def save(self, path: str):
+        """Persist the aggregates; written to a temporary file and swapped in atomically"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        scratch = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        with open(scratch, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(scratch, target)
+
+    @classmethod
+    def load(cls, path: str) -> "NoteTrendIndex":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def analyze(
+        self,
+        document_id: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        drift_threshold: float = 0.2
+    ) -> Dict:
+        """Summarize note volume and centroid drift over a time window"""
+        until = until or datetime.utcnow()
+        start_bucket = self._bucket_for(since)
+        end_bucket = self._bucket_for(until)
+        buckets = self._buckets.get(document_id, {})
+
+        in_window = sorted(
+            (bucket, aggregate) for bucket, aggregate in buckets.items()
+            if start_bucket <= bucket <= end_bucket
+        )
+        # Previous window of the same length, used as the drift baseline
+        span = end_bucket - start_bucket + 1
+        previous = [
+            aggregate for bucket, aggregate in buckets.items()
+            if start_bucket - span <= bucket < start_bucket
+        ]
+
+        windows: List[Dict] = []
+        previous_centroid = None
+        for bucket, aggregate in in_window:
+            centroid = aggregate.vector_sum / aggregate.count
+            drift = self._drift(previous_centroid, centroid)
+            windows.append({
+                "start": self._bucket_start(bucket).isoformat(),
+                "notes": aggregate.count,
+                "verified_notes": aggregate.verified,
+                "drift": drift
+            })
+            previous_centroid = centroid
+
+        total_notes = sum(aggregate.count for _, aggregate in in_window)
+        return {
+            "total_notes": total_notes,
+            "verified_notes": sum(aggregate.verified for _, aggregate in in_window),
+            "windows": windows,
+            "window_drift": self._drift(
+                self._centroid(previous),
+                self._centroid([aggregate for _, aggregate in in_window])
+            ),
+            "key_changes": [
+                window for window in windows
+                if window["drift"] is not None and window["drift"] >= drift_threshold
+            ]
+        }
+
+    @staticmethod
+    def _centroid(aggregates: List[WindowAggregate]) -> Optional[np.ndarray]:
+        count = sum(aggregate.count for aggregate in aggregates)
+        if not count:
+            return None
+        return sum(aggregate.vector_sum for aggregate in aggregates) / count
+
+    @staticmethod
+    def _drift(previous: Optional[np.ndarray], current: Optional[np.ndarray]) -> Optional[float]:
+        """Cosine distance between two centroids"""
+        if previous is None or current is None:
+            return None
+        norm = float(np.linalg.norm(previous) * np.linalg.norm(current))
+        if norm == 0:
+            return None
+        return 1.0 - float(np.dot(previous, current)) / norm
+
+
+
+@lru_cache()
+def get_note_trend_index() -> NoteTrendIndex:
+    """Process-wide trend index, restored from NOTE_TREND_INDEX_PATH when it exists"""
+    path = Path(settings.NOTE_TREND_INDEX_PATH)
+    if path.exists():
+        try:
+            return NoteTrendIndex.load(str(path))
+        except Exception as e:
+            print(f"Warning: could not load note trend index, rebuilding: {str(e)}")
+    return NoteTrendIndex()
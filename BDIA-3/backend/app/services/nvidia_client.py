@@ -0,0 +1,207 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+from functools import lru_cache
+import asyncio
+import random
+import re
+import time
+from app.config.settings import settings
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# ChatNVIDIA reports HTTP failures as "[429] Too Many Requests ..."
+STATUS_IN_MESSAGE = re.compile(r"^\[(\d{3})\]")
+
+
+def estimate_tokens(text: str, max_output_tokens: int = 0) -> int:
+    """Rough token count for rate limiting (about four characters per token)"""
+    return len(text) // 4 + 1 + max_output_tokens
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to ``per_minute`` units"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 when they already are)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self._level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def drain(self):
+        self._refill()
+        self._level = min(self._level, 0.0)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After when given"""
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            return max(min(retry_after, self.max_delay), backoff)
+        return backoff
+
+    @staticmethod
+    def status_code(error: Exception) -> Optional[int]:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is None:
+            match = STATUS_IN_MESSAGE.match(str(error))
+            status = int(match.group(1)) if match else None
+        return status
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        status = self.status_code(error)
+        if status is not None:
+            return status in RETRYABLE_STATUS_CODES
+        # SDK transport errors (httpx, openai, aiohttp) are named after what failed
+        name = type(error).__name__
+        return "Timeout" in name or "Connection" in name
+
+
+class NVIDIAClient:
+    """Shared gate for every call to the hosted NVIDIA API.
+
+    Requests are admitted by two token buckets (requests and tokens per
+    minute), at most ``max_in_flight`` run at once, and throttling or
+    transient failures are retried with jittered exponential backoff. A 429
+    also drains the request bucket so every caller pauses, not just the one
+    that was rejected. The wrapper is SDK agnostic: callers pass a zero
+    argument function that issues the request.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 40,
+        tokens_per_minute: float = 100000,
+        max_in_flight: int = 8,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.retry_policy = retry_policy or RetryPolicy()
+        # asyncio primitives are bound to the loop they were first used on
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._admission: Optional[asyncio.Lock] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _primitives(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._admission = asyncio.Lock()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._admission, self._in_flight
+
+    async def _admit(self, estimated_tokens: int):
+        admission, _ = self._primitives()
+        # One waiter at a time keeps admission first-come first-served
+        async with admission:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+
+    async def _backoff(self, error: Exception, attempt: int):
+        self._stats["retries"] += 1
+        if self.retry_policy.status_code(error) == 429:
+            self._stats["throttled"] += 1
+            self.requests.drain()
+        await asyncio.sleep(self.retry_policy.delay(attempt, self.retry_policy.retry_after(error)))
+
+    async def call(self, request: Callable[[], Awaitable[T]], estimated_tokens: int = 1) -> T:
+        """Run ``request`` under the rate limits, retrying transient failures"""
+        self._stats["calls"] += 1
+        for attempt in range(self.retry_policy.max_retries + 1):
+            _, in_flight = self._primitives()
+            try:
+                async with in_flight:
+                    await self._admit(estimated_tokens)
+                    return await request()
+            except Exception as e:
+                if attempt == self.retry_policy.max_retries or not self.retry_policy.is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                await self._backoff(e, attempt)
+
+    async def stream(
+        self,
+        request: Callable[[], AsyncIterator[T]],
+        estimated_tokens: int = 1
+    ) -> AsyncIterator[T]:
+        """Relay a streamed response; retries only happen before the first chunk"""
+        self._stats["calls"] += 1
+        for attempt in range(self.retry_policy.max_retries + 1):
+            _, in_flight = self._primitives()
+            started = False
+            try:
+                async with in_flight:
+                    await self._admit(estimated_tokens)
+                    async for chunk in request():
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or attempt == self.retry_policy.max_retries or not self.retry_policy.is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                await self._backoff(e, attempt)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "in_flight_limit": self.max_in_flight,
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity
+        }
+
+
+@lru_cache()
+def get_nvidia_client() -> NVIDIAClient:
+    """Process-wide client so the limits cover every service calling the API"""
+    return NVIDIAClient(
+        requests_per_minute=settings.NVIDIA_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.NVIDIA_TOKENS_PER_MINUTE,
+        max_in_flight=settings.NVIDIA_MAX_IN_FLIGHT,
+        retry_policy=RetryPolicy(
+            max_retries=settings.NVIDIA_MAX_RETRIES,
+            base_delay=settings.NVIDIA_BACKOFF_BASE_SECONDS,
+            max_delay=settings.NVIDIA_BACKOFF_MAX_SECONDS
+        )
+    )
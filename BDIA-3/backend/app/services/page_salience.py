@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional, Tuple
+import os
+import platform
+import re
+import numpy as np
+from PIL import Image
+
+try:
+    import fitz  # PyMuPDF
+    LAYOUT_SUPPORT = True
+except ImportError:
+    LAYOUT_SUPPORT = False
+
+try:
+    from pdf2image import convert_from_path
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+CAPTION_PATTERN = re.compile(r"\b(figure|fig\.|exhibit|table|chart|graph)\s*\d+", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"[-+]?\d[\d,]*\.?\d*%?")
+
+
+class PageSalienceScorer:
+    """Cheap first pass that ranks PDF pages by how likely they hold charts or tables.
+
+    Uses PDF layout (embedded images, vector drawings, captions, numeric
+    density) when PyMuPDF is available, and low-DPI thumbnails (ink coverage
+    and colourfulness) otherwise or in addition.
+    """
+
+    def __init__(self, thumbnail_dpi: int = 24):
+        self.thumbnail_dpi = thumbnail_dpi
+
+    def select_pages(self, pdf_path: str, top_k: int) -> List[int]:
+        """1-based page numbers of the top_k most visual pages, in page order"""
+        scores = self.score_pages(pdf_path)
+        ranked = sorted(scores, key=lambda item: item[1], reverse=True)[:top_k]
+        return sorted(page for page, _ in ranked)
+
+    def score_pages(self, pdf_path: str) -> List[Tuple[int, float]]:
+        """(page_number, score) for every page"""
+        layout_scores = self._layout_scores(pdf_path) if LAYOUT_SUPPORT else {}
+        thumbnail_scores = self._thumbnail_scores(pdf_path) if PDF_SUPPORT else {}
+
+        pages = sorted(set(layout_scores) | set(thumbnail_scores))
+        return [
+            (page, layout_scores.get(page, 0.0) + thumbnail_scores.get(page, 0.0))
+            for page in pages
+        ]
+
+    def _layout_scores(self, pdf_path: str) -> Dict[int, float]:
+        scores = {}
+        with fitz.open(pdf_path) as doc:
+            for idx, page in enumerate(doc, 1):
+                page_area = abs(page.rect) or 1.0
+                image_area = sum(
+                    abs(rect)
+                    for info in page.get_images(full=True)
+                    for rect in page.get_image_rects(info[0])
+                )
+                drawings = len(page.get_drawings())
+                text = page.get_text("text")
+                words = max(len(text.split()), 1)
+
+                scores[idx] = (
+                    2.0 * min(image_area / page_area, 1.0)
+                    + min(drawings / 200.0, 1.0)
+                    + 0.5 * min(len(CAPTION_PATTERN.findall(text)), 2)
+                    + min(len(NUMBER_PATTERN.findall(text)) / words, 1.0)
+                )
+        return scores
+
+    def _thumbnail_scores(self, pdf_path: str) -> Dict[int, float]:
+        kwargs = {"dpi": self.thumbnail_dpi}
+        if platform.system() == "Windows":
+            kwargs["poppler_path"] = os.getenv('POPPLER_PATH', r"C:\Program Files\poppler-23.11.0\Library\bin")
+        thumbnails = convert_from_path(pdf_path, **kwargs)
+        return {
+            idx: self._thumbnail_score(thumbnail)
+            for idx, thumbnail in enumerate(thumbnails, 1)
+        }
+
+    @staticmethod
+    def _thumbnail_score(thumbnail: Image.Image) -> float:
+        pixels = np.asarray(thumbnail.convert("RGB"), dtype=np.float32)
+        ink = float((pixels.mean(axis=2) < 230).mean())
+        # Text is mostly grey; charts and highlighted tables carry colour
+        colour = float(np.abs(pixels - pixels.mean(axis=2, keepdims=True)).mean() / 128.0)
+        return ink + 2.0 * min(colour, 1.0)
@@ -0,0 +1,71 @@
+from typing import Iterator, List, NamedTuple, Tuple
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+class PageTextChunk(NamedTuple):
+    page_number: int
+    chunk_index: int
+    text: str
+
+
+class PDFTextExtractor:
+    """Stream PDF text page by page as overlapping chunks.
+
+    Only one page is held in memory at a time, so long reports can be
+    indexed without materialising the full document text.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def iter_page_texts(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, whitespace-normalised text) for every page"""
+        with fitz.open(pdf_path) as doc:
+            for page_number, page in enumerate(doc, 1):
+                yield page_number, " ".join(page.get_text("text").split())
+
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, List[PageTextChunk]]]:
+        """Yield (page_number, chunks) for every page, including pages without text"""
+        for page_number, text in self.iter_page_texts(pdf_path):
+            yield page_number, [
+                PageTextChunk(page_number, chunk_index, chunk)
+                for chunk_index, chunk in enumerate(self._split(text))
+            ]
+
+    def iter_rendered_pages(self, pdf_path: str, dpi: int = 200) -> Iterator[Tuple[int, List[PageTextChunk], Image.Image]]:
+        """Yield (page_number, chunks, page image), rendering from the same open document"""
+        with fitz.open(pdf_path) as doc:
+            for page_number, page in enumerate(doc, 1):
+                text = " ".join(page.get_text("text").split())
+                chunks = [
+                    PageTextChunk(page_number, chunk_index, chunk)
+                    for chunk_index, chunk in enumerate(self._split(text))
+                ]
+                pixmap = page.get_pixmap(dpi=dpi)
+                yield page_number, chunks, Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
+
+    def iter_chunks(self, pdf_path: str) -> Iterator[PageTextChunk]:
+        """Yield text chunks in page order"""
+        for _, chunks in self.iter_pages(pdf_path):
+            yield from chunks
+
+    def _split(self, text: str) -> Iterator[str]:
+        start = 0
+        while start < len(text):
+            end = min(start + self.chunk_size, len(text))
+            # Break on a word boundary when one is available
+            if end < len(text):
+                boundary = text.rfind(" ", start + self.chunk_overlap, end)
+                if boundary > start:
+                    end = boundary
+            yield text[start:end].strip()
+            if end >= len(text):
+                break
+            overlap_start = max(end - self.chunk_overlap, start + 1)
+            # Start the overlap on a word boundary too
+            space = text.find(" ", overlap_start, end)
+            start = space + 1 if space != -1 else overlap_start
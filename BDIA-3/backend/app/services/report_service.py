@@ -2,10 +2,12 @@ from typing import Dict, List
 from datetime import datetime
 from ..models.document import Document
 from ..services.nemo_multimodal_service import NeMoMultimodalService
+from ..services.visual_index_service import VisualIndexService
 
 class ReportService:
     def __init__(self, nemo_service: NeMoMultimodalService):
         self.nemo_service = nemo_service
+        self.visual_index = VisualIndexService(nemo_service)
 
     async def generate_report(
         self,
@@ -17,13 +19,20 @@ class ReportService:
         try:
             # Extract visual elements
             visual_elements = []
+            visual_context = None
             if include_visuals:
-                if document.image_link:
+                # Prefer the ingestion-time visual index over re-running vision models
+                visual_elements = await self.visual_index.get_visual_elements(document.id)
+                if visual_elements:
+                    visual_context = self.nemo_service.visual_content_from_elements(visual_elements)
+                elif document.image_link:
                     visual_content = await self.nemo_service.process_image(document.image_link)
                     visual_elements.append(visual_content)
                 elif document.pdf_link:
                     visual_content = await self.nemo_service.process_pdf(document.pdf_link)
                     visual_elements.extend(visual_content)
+                if visual_context is None and visual_elements:
+                    visual_context = visual_elements[0]
 
             # Generate report content
             report_sections = []
@@ -39,8 +48,9 @@ class ReportService:
             for qa in qa_interactions:
                 response = await self.nemo_service.query_document(
                     query=qa["question"],
-                    document=document,
-                    visual_content=visual_elements[0] if visual_elements else None
+                    document_content=document.summary or document.title,
+                    visual_content=visual_context,
+                    document_id=document.id
                 )
                 
                 report_sections.append({
@@ -68,8 +78,10 @@ class ReportService:
                 {
                     "type": v["type"],
                     "reference": f"visual_{idx}",
-                    "path": v["path"],
-                    "page": v.get("page")
+                    "path": v.get("path") or v.get("source"),
+                    "page": v.get("page"),
+                    "caption": v.get("caption"),
+                    "bbox": v.get("bbox")
                 }
                 for idx, v in enumerate(visual_elements)
             ]
@@ -1,17 +1,31 @@
-from typing import List, Optional, Dict
-from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Sequence
+from datetime import datetime, timedelta
 from ..models.qa import ResearchNote
 from ..services.vector_store_service import VectorStoreService
 from ..services.nemo_multimodal_service import NeMoMultimodalService
-from ..database import get_db
+from ..services.semantic_answer_cache import get_semantic_answer_cache
+from ..services.snowflake_service import SnowflakeService
+from ..services.storage_backend import get_storage_backend
+from app.config.settings import settings
+import json
 import uuid
 
+NOTE_COLUMNS = ("id", "document_id", "question", "answer", "verified", "created_at", "verified_at")
+
 class ResearchNotesService:
     def __init__(self):
         self.vector_store = VectorStoreService()
         self.nemo_service = NeMoMultimodalService()
-        self.db = next(get_db())
+        self.answer_cache = get_semantic_answer_cache()
+        # Same research_notes table in Snowflake or the local SQLite database
+        self.storage = get_storage_backend()
+
+    async def _query(self, query: str, params: Optional[Sequence] = None, fetch: Optional[str] = None):
+        return await self.storage.run(SnowflakeService._execute, query, params, fetch)
+
+    @staticmethod
+    def _to_note(row: Sequence) -> ResearchNote:
+        return ResearchNote(**dict(zip(NOTE_COLUMNS, row)))
 
     async def create_note(
         self,
@@ -36,23 +50,59 @@ class ResearchNotesService:
             )
             
             # Add to database
-            self.db.add(note)
-            self.db.commit()
-            self.db.refresh(note)
+            await self._query(
+                """
+                INSERT INTO research_notes
+                (id, document_id, question, answer, verified, created_at, source_type, metadata)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    note.id, note.document_id, note.question, note.answer, False,
+                    note.created_at.isoformat(), source_type,
+                    json.dumps(metadata, default=str) if metadata else None
+                )
+            )
             
             # Add to vector store for searching
             await self.vector_store.add_research_note(
                 document_id=document_id,
                 note=content,
-                timestamp=note.created_at
+                timestamp=note.created_at,
+                metadata={"note_id": note_id}
             )
             
             return note
             
         except Exception as e:
-            self.db.rollback()
             raise Exception(f"Error creating research note: {str(e)}")
 
+    async def create_pending_note(
+        self,
+        document_id: str,
+        content: str,
+        metadata: Optional[Dict] = None
+    ) -> ResearchNote:
+        """Create a generated note that waits for validation"""
+        return await self.create_note(
+            document_id=document_id,
+            content=content,
+            source_type='qa_derived',
+            metadata=metadata
+        )
+
+    async def get_note(self, note_id: str) -> Optional[ResearchNote]:
+        """Fetch a single research note"""
+        try:
+            row = await self._query(
+                f"SELECT {', '.join(NOTE_COLUMNS)} FROM research_notes WHERE id = %s",
+                (note_id,),
+                fetch="one"
+            )
+            return self._to_note(row) if row else None
+            
+        except Exception as e:
+            raise Exception(f"Error fetching research note: {str(e)}")
+
     async def get_notes_by_document(
         self,
         document_id: str,
@@ -60,14 +110,12 @@ class ResearchNotesService:
     ) -> List[ResearchNote]:
         """Get all research notes for a document"""
         try:
-            query = self.db.query(ResearchNote).filter(
-                ResearchNote.document_id == document_id
-            )
-            
+            query = f"SELECT {', '.join(NOTE_COLUMNS)} FROM research_notes WHERE document_id = %s"
             if verified_only:
-                query = query.filter(ResearchNote.verified == True)
+                query += " AND verified = TRUE"
                 
-            return query.order_by(ResearchNote.created_at.desc()).all()
+            rows = await self._query(query + " ORDER BY created_at DESC", (document_id,), fetch="all")
+            return [self._to_note(row) for row in rows]
             
         except Exception as e:
             raise Exception(f"Error fetching research notes: {str(e)}")
@@ -80,34 +128,39 @@ class ResearchNotesService:
     ) -> ResearchNote:
         """Verify a research note"""
         try:
-            note = self.db.query(ResearchNote).filter(
-                ResearchNote.id == note_id
-            ).first()
+            note = await self.get_note(note_id)
             
             if not note:
                 raise Exception("Research note not found")
                 
             note.verified = True
             note.verified_at = datetime.utcnow()
-            note.validator_id = validator_id
-            if feedback:
-                note.feedback = feedback
-                
-            self.db.commit()
-            self.db.refresh(note)
+            await self._query(
+                """
+                UPDATE research_notes
+                SET verified = TRUE, verified_at = %s, validator_id = %s, feedback = COALESCE(%s, feedback)
+                WHERE id = %s
+                """,
+                (note.verified_at.isoformat(), validator_id, feedback, note_id)
+            )
+            self.vector_store.note_trends.mark_verified(note_id)
+            # Cached answers may predate the newly verified note
+            self.answer_cache.invalidate(note.document_id)
             
             return note
             
         except Exception as e:
-            self.db.rollback()
             raise Exception(f"Error verifying research note: {str(e)}")
 
     async def get_pending_validations(self) -> List[ResearchNote]:
         """Get all research notes pending validation"""
         try:
-            return self.db.query(ResearchNote).filter(
-                ResearchNote.verified == False
-            ).order_by(ResearchNote.created_at.asc()).all()
+            rows = await self._query(
+                f"SELECT {', '.join(NOTE_COLUMNS)} FROM research_notes "
+                "WHERE verified = FALSE ORDER BY created_at ASC",
+                fetch="all"
+            )
+            return [self._to_note(row) for row in rows]
             
         except Exception as e:
             raise Exception(f"Error fetching pending validations: {str(e)}")
@@ -168,43 +221,53 @@ class ResearchNotesService:
     ) -> ResearchNote:
         """Update an existing research note"""
         try:
-            note = self.db.query(ResearchNote).filter(
-                ResearchNote.id == note_id
-            ).first()
+            note = await self.get_note(note_id)
             
             if not note:
                 raise Exception("Research note not found")
                 
             if content:
                 note.answer = content
+                await self._query(
+                    "UPDATE research_notes SET answer = %s WHERE id = %s",
+                    (content, note_id)
+                )
                 # Update vector store
                 await self.vector_store.update_research_note(
                     document_id=note.document_id,
                     note_id=note_id,
-                    new_content=content
+                    new_content=content,
+                    timestamp=note.created_at,
+                    verified=note.verified
                 )
                 
             if metadata:
-                note.metadata = {
-                    **(note.metadata or {}),
+                row = await self._query(
+                    "SELECT metadata FROM research_notes WHERE id = %s",
+                    (note_id,),
+                    fetch="one"
+                )
+                merged = {
+                    **(json.loads(row[0]) if row and row[0] else {}),
                     **metadata
                 }
+                await self._query(
+                    "UPDATE research_notes SET metadata = %s WHERE id = %s",
+                    (json.dumps(merged, default=str), note_id)
+                )
                 
-            self.db.commit()
-            self.db.refresh(note)
+            if note.verified:
+                self.answer_cache.invalidate(note.document_id)
             
             return note
             
         except Exception as e:
-            self.db.rollback()
             raise Exception(f"Error updating research note: {str(e)}")
 
     async def delete_note(self, note_id: str):
         """Delete a research note"""
         try:
-            note = self.db.query(ResearchNote).filter(
-                ResearchNote.id == note_id
-            ).first()
+            note = await self.get_note(note_id)
             
             if not note:
                 raise Exception("Research note not found")
@@ -216,11 +279,11 @@ class ResearchNotesService:
             )
             
             # Remove from database
-            self.db.delete(note)
-            self.db.commit()
+            await self._query("DELETE FROM research_notes WHERE id = %s", (note_id,))
+            if note.verified:
+                self.answer_cache.invalidate(note.document_id)
             
         except Exception as e:
-            self.db.rollback()
             raise Exception(f"Error deleting research note: {str(e)}")
 
     async def search_notes(
@@ -241,11 +304,15 @@ class ResearchNotesService:
             # If verified_only, filter results
             if verified_only:
                 note_ids = [result['id'] for result in search_results['results']]
-                verified_notes = self.db.query(ResearchNote).filter(
-                    ResearchNote.id.in_(note_ids),
-                    ResearchNote.verified == True
-                ).all()
-                verified_ids = {note.id for note in verified_notes}
+                verified_ids = set()
+                if note_ids:
+                    rows = await self._query(
+                        f"SELECT id FROM research_notes WHERE verified = TRUE "
+                        f"AND id IN ({', '.join(['%s'] * len(note_ids))})",
+                        note_ids,
+                        fetch="all"
+                    )
+                    verified_ids = {row[0] for row in rows}
                 search_results['results'] = [
                     result for result in search_results['results']
                     if result['id'] in verified_ids
@@ -261,23 +328,70 @@ class ResearchNotesService:
         document_id: str,
         time_range: Optional[str] = "1w"
     ) -> Dict:
-        """Analyze trends in research notes"""
+        """Analyze trends in research notes; raises ValueError for a malformed time range"""
+        window = self._parse_time_range(time_range)
         try:
-            # Get notes within time range
-            notes = self.db.query(ResearchNote).filter(
-                ResearchNote.document_id == document_id
-            ).order_by(ResearchNote.created_at.desc()).all()
+            # Combine precomputed per-window aggregates; nothing is re-encoded
+            since = datetime.utcnow() - window
+            trend = self.vector_store.note_trends.analyze(document_id, since=since)
             
-            # Analyze trends using NeMo service
-            trend_analysis = await self.nemo_service.analyze_content_trend(
-                [note.answer for note in notes]
+            window_drift = trend['window_drift']
+            drift_text = (
+                f"centroid drift {window_drift:.3f} versus the previous {time_range}"
+                if window_drift is not None else "no earlier notes to compare against"
             )
             
             return {
-                'total_notes': len(notes),
-                'verified_notes': len([n for n in notes if n.verified]),
-                'trend_analysis': trend_analysis
+                'total_notes': trend['total_notes'],
+                'verified_notes': trend['verified_notes'],
+                'trend_analysis': {
+                    'trend_summary': (
+                        f"{trend['total_notes']} notes across {len(trend['windows'])} "
+                        f"active periods in the last {time_range}; {drift_text}"
+                    ),
+                    'key_changes': trend['key_changes'],
+                    'windows': trend['windows'],
+                    'window_drift': window_drift
+                }
             }
             
         except Exception as e:
-            raise Exception(f"Error analyzing research notes trends: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error analyzing research notes trends: {str(e)}")
+
+    async def backfill_note_trends(self):
+        """Fold stored notes the trend index has not seen yet into it, then persist it"""
+        try:
+            trends = self.vector_store.note_trends
+            rows = await self._query(f"SELECT {', '.join(NOTE_COLUMNS)} FROM research_notes", fetch="all")
+            notes = [self._to_note(row) for row in rows]
+            missing = [note for note in notes if trends.get_note(note.id) is None]
+            if missing:
+                embeddings = await self.vector_store.service_context.embed_model.aget_text_embedding_batch(
+                    [note.answer for note in missing]
+                )
+                for note, embedding in zip(missing, embeddings):
+                    trends.add_note(
+                        document_id=note.document_id,
+                        note_id=note.id,
+                        timestamp=note.created_at,
+                        embedding=embedding,
+                        verified=note.verified
+                    )
+            # Verifications made while the index was not running
+            for note in notes:
+                if note.verified:
+                    trends.mark_verified(note.id)
+            trends.save(settings.NOTE_TREND_INDEX_PATH)
+            return {"notes": len(notes), "backfilled": len(missing)}
+            
+        except Exception as e:
+            raise Exception(f"Error backfilling research note trends: {str(e)}")
+
+    @staticmethod
+    def _parse_time_range(time_range: Optional[str]) -> timedelta:
+        """Convert ranges like "1d", "2w", "3m" or "1y" into a timedelta"""
+        units = {"h": 1 / 24, "d": 1, "w": 7, "m": 30, "y": 365}
+        value = (time_range or "1w").strip().lower()
+        if len(value) < 2 or value[-1] not in units or not value[:-1].isdigit():
+            raise ValueError(f"Invalid time range: {time_range}")
+        return timedelta(days=int(value[:-1]) * units[value[-1]])
\ No newline at end of file
@@ -4,6 +4,8 @@ from ..models.search import SearchType, SearchResult, SearchResponse, VisualRefe
 from .vector_store_service import VectorStoreService
 from .nemo_multimodal_service import NeMoMultimodalService
 from .research_notes_service import ResearchNotesService
+from .visual_index_service import VisualIndexService
+from .snowflake_service import SnowflakeService
 
 class SearchService:
     def __init__(
@@ -15,6 +17,8 @@ class SearchService:
         self.vector_store = vector_store
         self.nemo_service = nemo_service
         self.notes_service = notes_service
+        self.visual_index = VisualIndexService()
+        self.snowflake_service = SnowflakeService()
 
     async def hybrid_search(
         self,
@@ -44,21 +48,26 @@ class SearchService:
                 
                 # Process document results
                 for r in doc_results:
-                    # Extract visual references from metadata
-                    visual_refs = []
-                    if r.metadata.get('visual_elements'):
-                        visual_refs = [
-                            VisualReference(
-                                type=v['type'],
-                                page=v['page'],
-                                caption=v.get('caption', '')
-                            )
-                            for v in r.metadata['visual_elements']
-                        ]
+                    result_document_id = document_id or r.metadata.get('document_id')
+                    
+                    # Visual references come from the ingestion-time visual index
+                    visual_elements = r.metadata.get('visual_elements') or await self.visual_index.get_visual_elements(
+                        result_document_id,
+                        page=r.metadata.get("page_number")
+                    )
+                    visual_refs = [
+                        VisualReference(
+                            type=v['type'],
+                            page=v['page'],
+                            caption=v.get('caption') or '',
+                            bbox=v.get('bbox')
+                        )
+                        for v in visual_elements
+                    ]
                     
                     results.append(
                         SearchResult(
-                            document_id=document_id or r.metadata.get('document_id'),
+                            document_id=result_document_id,
                             content=r.text,
                             relevance_score=r.score,
                             source_type="document",
@@ -101,6 +110,7 @@ class SearchService:
             start_idx = (page - 1) * page_size
             end_idx = min(start_idx + page_size, total_results)
             paginated_results = results[start_idx:end_idx]
+            await self._attach_documents(paginated_results)
             
             return SearchResponse(
                 results=paginated_results,
@@ -115,6 +125,15 @@ class SearchService:
         except Exception as e:
             raise Exception(f"Error performing hybrid search: {str(e)}")
 
+    async def _attach_documents(self, results: List[SearchResult]):
+        """Resolve the source documents of a page of results with one batched lookup"""
+        documents = await self.snowflake_service.get_documents([r.document_id for r in results])
+        for result in results:
+            document = documents.get(result.document_id)
+            if document:
+                result.document_title = document.title
+                result.pdf_link = document.pdf_link
+
     async def search_similar_notes(
         self,
         note_id: str,
@@ -128,7 +147,7 @@ class SearchService:
                 raise Exception(f"Research note {note_id} not found")
             
             # Get note embedding
-            note_embedding = await self.nemo_service.get_embedding(note.content)
+            note_embedding = await self.nemo_service.encode_text(note.answer)
             
             # Search for similar notes
             similar_notes = await self.vector_store.search_research_notes(
@@ -137,7 +156,7 @@ class SearchService:
                 top_k=limit
             )
             
-            return [
+            results = [
                 SearchResult(
                     document_id=r.metadata.get('document_id'),
                     content=r.text,
@@ -148,6 +167,8 @@ class SearchService:
                     validator=r.metadata.get("validator")
                 ) for r in similar_notes
             ]
+            await self._attach_documents(results)
+            return results
             
         except Exception as e:
             raise Exception(f"Error finding similar notes: {str(e)}")
@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime
+import threading
+import numpy as np
+from app.config.settings import settings
+
+
+class SemanticAnswerCache:
+    """Per-document cache of answers keyed by question embedding.
+
+    A new question reuses a previous answer when its embedding is at least
+    ``threshold`` cosine-similar to a cached question for the same document
+    (and embedding namespace, since different models are not comparable).
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries_per_document: int = 100):
+        self.threshold = threshold
+        self.max_entries_per_document = max_entries_per_document
+        # (namespace, document_id) -> question -> (normalised embedding, answer, cached_at)
+        self._entries: Dict[Tuple[str, str], "OrderedDict[str, Tuple[np.ndarray, Any, datetime]]"] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def lookup(
+        self,
+        document_id: str,
+        embedding: Sequence[float],
+        namespace: str = "default"
+    ) -> Optional[Dict]:
+        """Best cached answer above the similarity threshold, if any"""
+        query = self._normalise(embedding)
+        with self._lock:
+            entries = self._entries.get((namespace, document_id))
+            best_question, best_score = None, self.threshold
+            for question, (cached_embedding, _, _) in (entries or {}).items():
+                score = float(np.dot(query, cached_embedding))
+                if score >= best_score:
+                    best_question, best_score = question, score
+
+            if best_question is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            entries.move_to_end(best_question)
+            _, answer, cached_at = entries[best_question]
+            return {
+                "answer": answer,
+                "matched_question": best_question,
+                "similarity": best_score,
+                "cached_at": cached_at
+            }
+
+    def store(
+        self,
+        document_id: str,
+        question: str,
+        embedding: Sequence[float],
+        answer: Any,
+        namespace: str = "default"
+    ):
+        with self._lock:
+            entries = self._entries.setdefault((namespace, document_id), OrderedDict())
+            entries[question] = (self._normalise(embedding), answer, datetime.now())
+            entries.move_to_end(question)
+            while len(entries) > self.max_entries_per_document:
+                entries.popitem(last=False)
+
+    def invalidate(self, document_id: str):
+        """Drop every cached answer for a document, across namespaces"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == document_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len({key[1] for key in self._entries}),
+                "entries": sum(len(entries) for entries in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses
+            }
+
+    @staticmethod
+    def _normalise(embedding: Sequence[float]) -> np.ndarray:
+        if hasattr(embedding, "detach"):
+            embedding = embedding.detach().cpu().numpy()
+        vector = np.asarray(embedding, dtype=np.float32).flatten()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+@lru_cache()
+def get_semantic_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache shared by the Q&A and RAG services"""
+    return SemanticAnswerCache(
+        threshold=settings.ANSWER_CACHE_THRESHOLD,
+        max_entries_per_document=settings.ANSWER_CACHE_MAX_ENTRIES
+    )
@@ -0,0 +1,64 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from functools import lru_cache
+import asyncio
+import json
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce identical in-flight calls into one shared task.
+
+    Calls are keyed by (operation, document_id, params). While a call for a
+    key is running, later callers with the same key await its result instead
+    of starting their own job. The key is released as soon as the task
+    finishes, so results are never cached beyond the flight itself.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    @staticmethod
+    def make_key(operation: str, document_id: Optional[str], params: Optional[Dict] = None) -> Tuple:
+        return operation, document_id, json.dumps(params or {}, sort_keys=True, default=str)
+
+    async def do(
+        self,
+        operation: str,
+        document_id: Optional[str],
+        func: Callable[[], Awaitable[T]],
+        params: Optional[Dict] = None
+    ) -> T:
+        key = self.make_key(operation, document_id, params)
+        task = self._flights.get(key)
+        if task is None:
+            self._started += 1
+            task = asyncio.ensure_future(func())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self._coalesced += 1
+        # A caller that disconnects must not cancel the job other callers share
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Mark the exception retrieved in case every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "started": self._started,
+            "coalesced": self._coalesced
+        }
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    """Process-wide instance so every router and service shares in-flight jobs"""
+    return SingleFlight()
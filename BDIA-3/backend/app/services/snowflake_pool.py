@@ -0,0 +1,364 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Sequence, Tuple
+import snowflake.connector
+from app.config.settings import settings
+from .storage_backend import StorageBackend
+
+_EXHAUSTED = object()
+
+
+class SnowflakePoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the checkout timeout"""
+
+
+class SnowflakeConnectionPool(StorageBackend):
+    """Bounded pool of Snowflake connections.
+
+    Connections are checked out per query and returned afterwards. Idle
+    connections older than ``idle_timeout`` are closed instead of reused,
+    and a connection idle for longer than ``health_check_interval`` is
+    pinged with ``SELECT 1`` before being handed out. Blocking connector
+    calls run on a dedicated thread pool sized to the connection limit so
+    they never stall the event loop. Async callers wait for a free slot on
+    the event loop before any thread is used, so a pool thread never sits in
+    ``acquire`` while the iterator steps that would free a connection queue
+    behind it.
+
+    Long statements can instead be submitted with ``submit``: the query runs
+    in the warehouse while ``wait_for`` polls its status, checking out a
+    connection only for each brief status call.
+    """
+
+    supports_async_queries = True
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 5,
+        idle_timeout: float = 300,
+        health_check_interval: float = 60,
+        checkout_timeout: float = 30,
+        async_poll_interval: float = 2,
+        async_query_timeout: float = 600
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.async_poll_interval = async_poll_interval
+        self.async_query_timeout = async_query_timeout
+        # (connection, last returned at); most recently used at the right
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_size, thread_name_prefix="snowflake")
+        # One slot per connection for async callers; created lazily so it binds to the running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._checkouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._async_submitted = 0
+        self._async_cancelled = 0
+
+    def acquire(self) -> Any:
+        """Check out a healthy connection, opening one if the pool has room"""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn, last_used = None, None
+            with self._condition:
+                self._reap_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SnowflakePoolTimeoutError(
+                            f"No Snowflake connection available within {self.checkout_timeout}s"
+                        )
+                    self._condition.wait(remaining)
+                    self._reap_idle()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._created += 1
+            elif not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                continue
+
+            with self._condition:
+                self._checkouts += 1
+            return conn
+
+    def release(self, conn: Any, suspect: bool = False):
+        """Return a connection; closed connections are dropped from the pool.
+
+        ``suspect`` connections (a query on them failed) are health checked
+        on their next checkout regardless of how recently they were used.
+        """
+        if self._is_closed(conn):
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, float("-inf") if suspect else time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, suspect=True)
+            raise
+        else:
+            self.release(conn)
+
+    async def _wait_for_slot(self):
+        """Wait on the event loop, not on a pool thread, until a connection can be checked out"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_size)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.checkout_timeout)
+        except asyncio.TimeoutError:
+            raise SnowflakePoolTimeoutError(
+                f"No Snowflake connection available within {self.checkout_timeout}s"
+            )
+
+    def _release_slot_when_done(self, job: Future, loop: asyncio.AbstractEventLoop):
+        # The slot is held until the thread is done, even if the awaiting task was cancelled
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._slots.release))
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run ``func(connection, *args, **kwargs)`` on the pool's threads"""
+        def checkout_and_call():
+            with self.connection() as conn:
+                return func(conn, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        await self._wait_for_slot()
+        job = self._executor.submit(checkout_and_call)
+        self._release_slot_when_done(job, loop)
+        return await asyncio.wrap_future(job)
+
+    async def iterate(self, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        """Yield from ``func(connection, *args, **kwargs)``, a blocking generator.
+
+        The connection (and its slot) stays checked out until the generator
+        is exhausted or closed, but each step runs as its own task on the
+        pool's threads, so a slow consumer does not hold a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        await self._wait_for_slot()
+        checkout = self._executor.submit(self.acquire)
+        try:
+            conn = await asyncio.wrap_future(checkout)
+        except BaseException:
+            # A checkout that completes after we stopped waiting goes straight back
+            checkout.add_done_callback(self._release_abandoned)
+            self._slots.release()
+            raise
+        iterator = func(conn, *args, **kwargs)
+        # Serialises steps with cleanup, which may be scheduled while a step is still running
+        step_lock = threading.Lock()
+        failed = False
+
+        def step():
+            with step_lock:
+                return next(iterator, _EXHAUSTED)
+
+        def finish():
+            with step_lock:
+                # Runs the generator's cleanup (closing its cursor) before the connection is reused
+                iterator.close()
+                self.release(conn, suspect=failed)
+
+        try:
+            while True:
+                item = await loop.run_in_executor(self._executor, step)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release_slot_when_done(self._executor.submit(finish), loop)
+
+    def _release_abandoned(self, checkout: Future):
+        if not checkout.cancelled() and checkout.exception() is None:
+            self.release(checkout.result())
+
+    async def submit(self, query: str, params: Optional[Sequence] = None) -> str:
+        """Start ``query`` in the warehouse and return its query id without waiting for it"""
+        def start(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute_async(query, params)
+                return cursor.sfqid
+            finally:
+                cursor.close()
+
+        query_id = await self.run(start)
+        self._async_submitted += 1
+        return query_id
+
+    async def wait_for(self, query_id: str):
+        """Poll until a submitted query finishes, raising if it failed.
+
+        If the waiting task is cancelled (e.g. the client disconnected) or
+        the query outlives ``async_query_timeout``, it is cancelled in the
+        warehouse as well.
+        """
+        deadline = time.monotonic() + self.async_query_timeout
+        delay = 0.1
+        try:
+            while await self.run(self._is_still_running, query_id):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(
+                        f"Snowflake query {query_id} still running after {self.async_query_timeout}s"
+                    )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.async_poll_interval)
+        except (asyncio.CancelledError, TimeoutError):
+            await asyncio.shield(self.cancel(query_id))
+            raise
+
+    async def cancel(self, query_id: str):
+        try:
+            await self.run(self._cancel_query, query_id)
+            self._async_cancelled += 1
+        except Exception as e:
+            print(f"Warning: failed to cancel Snowflake query {query_id}: {str(e)}")
+
+    def iterate_results(self, query_id: str, fetch: str = "all") -> AsyncIterator[Any]:
+        """Yield a finished query's rows (``fetch="all"``, one list) or Arrow batches (``"arrow"``)"""
+        return self.iterate(self._iter_query_results, query_id, fetch)
+
+    @staticmethod
+    def _is_still_running(conn: Any, query_id: str) -> bool:
+        status = conn.get_query_status_throw_if_error(query_id)
+        return conn.is_still_running(status)
+
+    @staticmethod
+    def _cancel_query(conn: Any, query_id: str):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT SYSTEM$CANCEL_QUERY(%s)", (query_id,))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _iter_query_results(conn: Any, query_id: str, fetch: str):
+        cursor = conn.cursor()
+        try:
+            cursor.get_results_from_sfqid(query_id)
+            if fetch == "arrow":
+                yield from cursor.fetch_arrow_batches()
+            else:
+                yield cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                "backend": "snowflake",
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "async_submitted": self._async_submitted,
+                "async_cancelled": self._async_cancelled
+            }
+
+    def _reap_idle(self):
+        # Oldest connections sit at the left; caller holds the condition
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._discarded += 1
+            self._close(conn)
+
+    def _is_healthy(self, conn: Any, last_used: float) -> bool:
+        if self._is_closed(conn):
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn: Any):
+        self._close(conn)
+        with self._condition:
+            self._size -= 1
+            self._discarded += 1
+            self._condition.notify()
+
+    @staticmethod
+    def _is_closed(conn: Any) -> bool:
+        try:
+            return conn.is_closed()
+        except Exception:
+            return True
+
+    @staticmethod
+    def _close(conn: Any):
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Warning: failed to close Snowflake connection: {str(e)}")
+
+
+@lru_cache()
+def get_snowflake_pool() -> SnowflakeConnectionPool:
+    """Process-wide pool shared by every SnowflakeService instance"""
+    return SnowflakeConnectionPool(
+        connect=lambda: snowflake.connector.connect(
+            user=settings.SNOWFLAKE_USER,
+            password=settings.SNOWFLAKE_PASSWORD,
+            account=settings.SNOWFLAKE_ACCOUNT,
+            warehouse=settings.SNOWFLAKE_WAREHOUSE,
+            database=settings.SNOWFLAKE_DATABASE,
+            schema=settings.SNOWFLAKE_SCHEMA
+        ),
+        max_size=settings.SNOWFLAKE_POOL_SIZE,
+        idle_timeout=settings.SNOWFLAKE_POOL_IDLE_TIMEOUT,
+        health_check_interval=settings.SNOWFLAKE_POOL_HEALTH_CHECK_INTERVAL,
+        checkout_timeout=settings.SNOWFLAKE_POOL_CHECKOUT_TIMEOUT,
+        async_poll_interval=settings.SNOWFLAKE_ASYNC_POLL_INTERVAL,
+        async_query_timeout=settings.SNOWFLAKE_ASYNC_QUERY_TIMEOUT
+    )
@@ -1,101 +1,268 @@
-import snowflake.connector
-from app.config.settings import Settings, settings 
+from app.config.settings import Settings, settings
 from ..models.document import Document
-from typing import List
+from .storage_backend import get_storage_backend
+from .document_cache import get_document_cache
+from .write_buffer import get_write_buffer
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+import asyncio
+import base64
+import json
+
+CATALOG_COLUMNS = ("id", "title", "summary", "image_link", "pdf_link", "created_at", "updated_at")
+# Listing pages skip the (potentially long) summary unless asked for it
+LISTING_COLUMNS = ("id", "title", "image_link", "pdf_link")
+# Ids per IN query when fetching documents in bulk
+IN_QUERY_CHUNK_SIZE = 1000
+# Buffered inserts; created_at is captured when the row is queued, not when it is flushed
+QA_INTERACTION_INSERT = (
+    "INSERT INTO qa_interactions (document_id, question, answer, created_at) VALUES (%s, %s, %s, %s)"
+)
+RESEARCH_SUMMARY_INSERT = (
+    "INSERT INTO research_summaries (document_id, summary, created_at) VALUES (%s, %s, %s)"
+)
+# Catalog orderings: name -> (keyset column, descending)
+CATALOG_ORDERS = {
+    "id": ("id", False),
+    "newest": ("created_at", True)
+}
 
 class SnowflakeService:
     def __init__(self):
         self.settings = Settings()
-        self.conn = snowflake.connector.connect(
-            max_connections=5,
-            min_connections=1,
-            user=self.settings.SNOWFLAKE_USER,
-
-            password=self.settings.SNOWFLAKE_PASSWORD,
-            account=self.settings.SNOWFLAKE_ACCOUNT,
-            warehouse=self.settings.SNOWFLAKE_WAREHOUSE,
-            database=self.settings.SNOWFLAKE_DATABASE,
-            schema=self.settings.SNOWFLAKE_SCHEMA
-        )
-    
+        # Snowflake pool, or the local SQLite database for offline runs
+        self.pool = get_storage_backend()
+        self.document_cache = get_document_cache()
+        self.write_buffer = get_write_buffer()
 
-    async def get_all_documents(self) -> List[Document]:
-        """Fetch all documents from Snowflake"""
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _execute(conn, query: str, params: Optional[Sequence] = None, fetch: Optional[str] = None) -> Any:
+        """Run one statement on a checked-out connection (called on a pool thread)"""
+        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT * FROM documents")
-            rows = cursor.fetchall()
-            return [Document(
-                id=row[0],
-                title=row[1],
-                summary=row[2],
-                image_link=row[3],
-                pdf_link=row[4]
-            ) for row in rows]
+            cursor.execute(query, params)
+            if fetch == "one":
+                return cursor.fetchone()
+            if fetch == "all":
+                return cursor.fetchall()
+            conn.commit()
         finally:
             cursor.close()
 
-    async def get_document(self, document_id: str) -> Document:
-        """Fetch a specific document from Snowflake"""
-        cursor = self.conn.cursor()
+    async def _query(self, query: str, params: Optional[Sequence] = None, fetch: Optional[str] = None) -> Any:
+        return await self.pool.run(self._execute, query, params, fetch)
+
+    async def _long_query(self, query: str, params: Optional[Sequence] = None) -> List:
+        """All rows of a slow analytic query.
+
+        On Snowflake the statement is submitted asynchronously and polled, so
+        no connection or worker thread is held while it runs, and it is
+        cancelled in the warehouse if the caller goes away.
+        """
+        if not self.pool.supports_async_queries:
+            return await self._query(query, params, fetch="all")
+        query_id = await self.pool.submit(query, params)
+        await self.pool.wait_for(query_id)
+        rows = []
+        async for batch in self.pool.iterate_results(query_id):
+            rows.extend(batch)
+        return rows
+
+    def get_connection(self):
+        """Context manager checking out a pooled connection for multi-statement work"""
+        return self.pool.connection()
+
+    async def get_all_documents(self) -> List[Document]:
+        """Fetch all documents from Snowflake (prefer get_document_page for listings)"""
+        rows = await self._long_query(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents ORDER BY id")
+        return [Document(**dict(zip(CATALOG_COLUMNS, row))) for row in rows]
+
+    async def get_document_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        order: str = "id",
+        columns: Optional[Sequence[str]] = None
+    ) -> Dict:
+        """One page of the catalog using keyset pagination.
+
+        ``cursor`` is the opaque ``next_cursor`` of the previous page, so each
+        page costs the same however deep into the catalog it is.
+        """
+        if order not in CATALOG_ORDERS:
+            raise ValueError(f"Unknown catalog order: {order}")
+        order_column, descending = CATALOG_ORDERS[order]
+        selected = self.project_columns(columns, order_column)
+        comparison, direction = ("<", "DESC") if descending else (">", "ASC")
+
+        where, params = "", []
+        if cursor:
+            last_value, last_id = self._decode_cursor(cursor)
+            if order_column == "id":
+                where = f"WHERE id {comparison} %s"
+                params = [last_id]
+            else:
+                # Ties on the order column are broken by id
+                where = (
+                    f"WHERE ({order_column} {comparison} %s "
+                    f"OR ({order_column} = %s AND id {comparison} %s))"
+                )
+                params = [last_value, last_value, last_id]
+        order_by = f"id {direction}" if order_column == "id" else f"{order_column} {direction}, id {direction}"
+
+        # One extra row tells us whether another page exists
+        rows = await self._query(
+            f"SELECT {', '.join(selected)} FROM documents {where} ORDER BY {order_by} LIMIT %s",
+            params + [limit + 1],
+            fetch="all"
+        )
+        documents = [dict(zip(selected, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = documents[-1]
+            next_cursor = self._encode_cursor(last[order_column], last["id"])
+
+        return {
+            "documents": documents,
+            "count": len(documents),
+            "next_cursor": next_cursor
+        }
+
+    async def export_documents(self, columns: Optional[Sequence[str]] = None) -> AsyncIterator:
+        """Stream the whole catalog as Arrow tables, one result batch at a time"""
+        selected = self.project_columns(columns, "id")
+        query = f"SELECT {', '.join(selected)} FROM documents ORDER BY id"
+        if self.pool.supports_async_queries:
+            # The export query runs in the warehouse without pinning a connection
+            query_id = await self.pool.submit(query)
+            await self.pool.wait_for(query_id)
+            batches = self.pool.iterate_results(query_id, fetch="arrow")
+        else:
+            batches = self.pool.iterate(self._iter_arrow_batches, query)
+        async for table in batches:
+            yield table
+
+    @staticmethod
+    def _iter_arrow_batches(conn, query: str, params: Optional[Sequence] = None):
+        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "SELECT * FROM documents WHERE id = %s",
-                (document_id,)
-            )
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return Document(
-                id=row[0],
-                title=row[1],
-                summary=row[2],
-                image_link=row[3],
-                pdf_link=row[4]
-            )
+            cursor.execute(query, params)
+            yield from cursor.fetch_arrow_batches()
         finally:
             cursor.close()
 
-    # Add these methods to the existing SnowflakeService class
+    @staticmethod
+    def project_columns(columns: Optional[Sequence[str]], order_column: str) -> List[str]:
+        """Validated column list; the keyset columns are always included"""
+        requested = set(columns or LISTING_COLUMNS)
+        unknown = requested - set(CATALOG_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown catalog columns: {', '.join(sorted(unknown))}")
+        requested.update({"id", order_column})
+        return [column for column in CATALOG_COLUMNS if column in requested]
+
+    @staticmethod
+    def _encode_cursor(order_value: Any, document_id: str) -> str:
+        payload = json.dumps([order_value, document_id], default=str)
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[Any, str]:
+        try:
+            order_value, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return order_value, document_id
+        except (ValueError, TypeError):
+            raise ValueError("Invalid catalog cursor")
+
+    async def get_document(self, document_id: str) -> Document:
+        """Fetch a specific document, from the document cache when possible"""
+        await self._check_catalog_version()
+        document = await self.document_cache.get(document_id)
+        if document is not None:
+            return document
+
+        epoch = self.document_cache.epoch
+        row = await self._query(
+            f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents WHERE id = %s",
+            (document_id,),
+            fetch="one"
+        )
+        if not row:
+            return None
+        document = Document(**dict(zip(CATALOG_COLUMNS, row)))
+        await self.document_cache.set(document_id, document, epoch=epoch)
+        return document
+
+    async def get_documents(self, document_ids: Sequence[str]) -> Dict[str, Document]:
+        """Fetch many documents by id: cached rows first, the rest with chunked IN queries"""
+        await self._check_catalog_version()
+        unique_ids = list(dict.fromkeys(document_id for document_id in document_ids if document_id))
+        documents = await self.document_cache.get_many(unique_ids)
+        missing = [document_id for document_id in unique_ids if document_id not in documents]
+        if not missing:
+            return documents
 
-async def update_document_summary(self, document_id: str, summary: str):
-    """Update document summary in Snowflake"""
-    cursor = self.conn.cursor()
-    try:
-        cursor.execute(
+        epoch = self.document_cache.epoch
+        chunks = [missing[idx:idx + IN_QUERY_CHUNK_SIZE] for idx in range(0, len(missing), IN_QUERY_CHUNK_SIZE)]
+        # Chunks run concurrently, each on its own pooled connection
+        results = await asyncio.gather(*[
+            self._query(
+                f"SELECT {', '.join(CATALOG_COLUMNS)} FROM documents "
+                f"WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                chunk,
+                fetch="all"
+            )
+            for chunk in chunks
+        ])
+        fetched = {}
+        for rows in results:
+            for row in rows:
+                document = Document(**dict(zip(CATALOG_COLUMNS, row)))
+                fetched[document.id] = document
+        await self.document_cache.set_many(fetched, epoch=epoch)
+        documents.update(fetched)
+        return documents
+
+    async def _check_catalog_version(self):
+        """Drop cached documents when the pipeline has published a new catalog"""
+        if not self.document_cache.version_check_due():
+            return
+        try:
+            row = await self._query("SELECT MAX(version) FROM catalog_version", fetch="one")
+            self.document_cache.set_version(str(row[0]) if row and row[0] is not None else None)
+        except Exception as e:
+            print(f"Warning: catalog version check failed: {str(e)}")
+
+    async def update_document_summary(self, document_id: str, summary: str):
+        """Update document summary in Snowflake"""
+        await self._query(
             "UPDATE documents SET summary = %s WHERE id = %s",
             (summary, document_id)
         )
-        self.conn.commit()
-    finally:
-        cursor.close()
-
-async def get_document_qa_interactions(self, document_id: str):
-    """Fetch Q&A interactions for a document"""
-    cursor = self.conn.cursor()
-    try:
-        cursor.execute(
-            "SELECT question, answer FROM qa_interactions WHERE document_id = %s ORDER BY created_at",
-            (document_id,)
+        await self.document_cache.invalidate(document_id)
+
+    async def log_qa_interaction(self, document_id: str, question: str, answer: str):
+        """Queue a Q&A interaction; it is written with the next batch"""
+        await self.write_buffer.add(
+            QA_INTERACTION_INSERT,
+            (document_id, question, answer, datetime.now().isoformat())
         )
-        return [{"question": row[0], "answer": row[1]} for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-
-async def store_research_summary(self, document_id: str, summary: str):
-    """Store research summary in Snowflake"""
-    cursor = self.conn.cursor()
-    try:
-        cursor.execute(
-            """
-            INSERT INTO research_summaries (document_id, summary, created_at)
-            VALUES (%s, %s, CURRENT_TIMESTAMP)
-            """,
-            (document_id, summary)
+
+    async def get_document_qa_interactions(self, document_id: str):
+        """Fetch Q&A interactions for a document"""
+        # Read our own queued writes
+        await self.write_buffer.flush(QA_INTERACTION_INSERT)
+        rows = await self._query(
+            "SELECT question, answer FROM qa_interactions WHERE document_id = %s ORDER BY created_at",
+            (document_id,),
+            fetch="all"
         )
-        self.conn.commit()
-    finally:
-        cursor.close()
+        return [{"question": row[0], "answer": row[1]} for row in rows]
 
-async def get_connection(self):
-        return self.pool.get_connection()
\ No newline at end of file
+    async def store_research_summary(self, document_id: str, summary: str):
+        """Queue a research summary for the next batched insert"""
+        await self.write_buffer.add(
+            RESEARCH_SUMMARY_INSERT,
+            (document_id, summary, datetime.now().isoformat())
+        )
+        await self.document_cache.invalidate(document_id)
@@ -0,0 +1,276 @@
+import asyncio
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence
+from app.config.settings import settings
+
+_EXHAUSTED = object()
+
+# Tables the backend services read and write. The warehouse holds the same
+# tables; the SQLite backend creates them on first use.
+SCHEMA_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        summary TEXT,
+        image_link TEXT,
+        pdf_link TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS documents_created_at ON documents (created_at, id)",
+    """
+    CREATE TABLE IF NOT EXISTS qa_interactions (
+        document_id TEXT NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS qa_interactions_document ON qa_interactions (document_id, created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS research_summaries (
+        document_id TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS research_notes (
+        id TEXT PRIMARY KEY,
+        document_id TEXT NOT NULL,
+        question TEXT,
+        answer TEXT NOT NULL,
+        verified BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verified_at TIMESTAMP,
+        validator_id TEXT,
+        feedback TEXT,
+        source_type TEXT,
+        metadata TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS research_notes_document ON research_notes (document_id, created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        version INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+)
+
+
+class StorageBackend(ABC):
+    """Where the backend services run their SQL.
+
+    Callers pass blocking ``func(connection, ...)`` callables that use the
+    DB-API cursor interface with ``%s`` placeholders and portable SQL, so
+    the same queries run against Snowflake and the local SQLite database.
+    Backends that can run a statement server-side without holding a
+    connection set ``supports_async_queries`` and implement ``submit``,
+    ``wait_for`` and ``iterate_results``.
+    """
+
+    supports_async_queries = False
+
+    @abstractmethod
+    def connection(self) -> ContextManager[Any]:
+        """Check out a connection for multi-statement work"""
+
+    @abstractmethod
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run ``func(connection, *args, **kwargs)`` without blocking the event loop"""
+
+    @abstractmethod
+    def iterate(self, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        """Yield from ``func(connection, *args, **kwargs)``, a blocking generator"""
+
+    @abstractmethod
+    def close_all(self):
+        """Close idle connections (called on shutdown)"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Usage counters for the health endpoint"""
+
+
+@lru_cache(maxsize=256)
+def _to_qmark(query: str) -> str:
+    # sqlite3 only understands ? placeholders
+    return re.sub(r"%(s|%)", lambda match: "?" if match.group(1) == "s" else "%", query)
+
+
+class _SQLiteCursor:
+    """DB-API cursor that accepts the ``%s`` placeholders the services use"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query: str, params: Optional[Sequence] = None):
+        self._cursor.execute(_to_qmark(query), tuple(params or ()))
+        return self
+
+    def executemany(self, query: str, rows: Sequence[Sequence]):
+        self._cursor.executemany(_to_qmark(query), [tuple(row) for row in rows])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetch_arrow_batches(self, batch_size: int = 10000) -> Iterator[Any]:
+        import pyarrow as pa
+
+        columns = [column[0] for column in self._cursor.description]
+        while True:
+            rows = self._cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield pa.Table.from_pydict({name: list(values) for name, values in zip(columns, zip(*rows))})
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self) -> _SQLiteCursor:
+        return _SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite database with the warehouse schema.
+
+    Lets the API, load tests and benchmarks run without a Snowflake
+    account. Each worker thread keeps its own connection; WAL mode lets
+    readers proceed while a write is committing.
+    """
+
+    def __init__(self, path: str, max_workers: int = 4):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sqlite")
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for statement in SCHEMA_STATEMENTS:
+                cursor.execute(statement)
+            conn.commit()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[_SQLiteConnection]:
+        raw = getattr(self._local, "conn", None)
+        if raw is None:
+            raw = self._local.conn = self._open()
+        with self._lock:
+            self._checkouts += 1
+        conn = _SQLiteConnection(raw)
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        def call():
+            with self.connection() as conn:
+                return func(conn, *args, **kwargs)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def iterate(self, func: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        # A dedicated connection, since steps may land on any worker thread
+        raw = await loop.run_in_executor(self._executor, self._open)
+        iterator = func(_SQLiteConnection(raw), *args, **kwargs)
+        step_lock = threading.Lock()
+
+        def step():
+            with step_lock:
+                return next(iterator, _EXHAUSTED)
+
+        def finish():
+            with step_lock:
+                iterator.close()
+                self._forget(raw)
+
+        try:
+            while True:
+                item = await loop.run_in_executor(self._executor, step)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        finally:
+            loop.run_in_executor(self._executor, finish)
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "path": str(self.path),
+                "connections": len(self._connections),
+                "checkouts": self._checkouts
+            }
+
+    def _forget(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+
+@lru_cache()
+def get_storage_backend() -> StorageBackend:
+    """Process-wide backend chosen by STORAGE_BACKEND ("snowflake" or "sqlite")"""
+    if settings.STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(settings.SQLITE_DATABASE_PATH)
+    if settings.STORAGE_BACKEND != "snowflake":
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    # Imported here so offline runs do not need the Snowflake connector
+    from .snowflake_pool import get_snowflake_pool
+    return get_snowflake_pool()
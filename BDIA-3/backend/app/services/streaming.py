@@ -0,0 +1,31 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+import json
+
+
+def sse_event(data: Dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_stream(
+    tokens: AsyncIterator[str],
+    on_complete: Optional[Callable[[str], Awaitable[Optional[Dict]]]] = None
+) -> AsyncIterator[str]:
+    """Relay tokens as ``data`` events, then a final ``done`` (or ``error``) event.
+
+    ``on_complete`` receives the full text once the stream ends; whatever it
+    returns is attached to the ``done`` event.
+    """
+    parts = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield sse_event({"token": token})
+        done = {}
+        if on_complete is not None:
+            done = await on_complete("".join(parts)) or {}
+        yield sse_event(done, event="done")
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-band
+        yield sse_event({"detail": str(e)}, event="error")
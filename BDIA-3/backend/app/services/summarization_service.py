@@ -1,76 +1,359 @@
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List
 from datetime import datetime
+import asyncio
+import re
+import time
 from app.config.settings import Settings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from .pdf_text_extractor import PDFTextExtractor
+from .summary_store import SummaryStore, content_hash
+from .nvidia_client import estimate_tokens, get_nvidia_client
+from .single_flight import get_single_flight
+
+# Bump whenever a summary prompt changes so stored summaries are not reused
+SUMMARY_PROMPT_VERSION = "2"
+
+# About one section in this many ends a chunk (or merge group) because of its
+# content alone, so boundaries after an edited section fall back into place
+CHUNK_BOUNDARY_MODULUS = 4
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+CHUNK_SUMMARY_PROMPT = (
+    "Summarize this section of a research document, keeping key findings, "
+    "figures, methodology details and conclusions.\n\nSection:\n"
+)
+REDUCE_SUMMARY_PROMPT = (
+    "Combine the following partial summaries of one document into a single "
+    "coherent summary. Remove repetition and keep every distinct finding.\n\n"
+    "Partial summaries:\n"
+)
+FINAL_SUMMARY_PROMPT = (
+    "Generate a comprehensive summary of this document, "
+    "including key findings, methodology, and conclusions. "
+    "Format the response with clear sections."
+)
 
 class SummarizationService:
     def __init__(self):
         self.settings = Settings()
         # Initialize the NVIDIA AI model
+        model_kwargs = {"base_url": self.settings.NVIDIA_BASE_URL} if self.settings.NVIDIA_BASE_URL else {}
         self.model = ChatNVIDIA(
             api_key=self.settings.NVIDIA_API_KEY,
+            **model_kwargs
         )
+        # Rate limits, retries and the in-flight cap for every model call
+        self.client = get_nvidia_client()
+        # Identical concurrent summary requests share one job
+        self.single_flight = get_single_flight()
         
-        # Initialize text splitter for long documents
+        # Splits single pages or paragraphs that are longer than a chunk
+        self.chunk_size = self.settings.SUMMARY_CHUNK_SIZE
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
+            chunk_size=self.settings.SUMMARY_CHUNK_SIZE,
             chunk_overlap=200,
             length_function=len,
         )
+        self.text_extractor = PDFTextExtractor()
+        self.context_chars = self.settings.SUMMARY_CONTEXT_CHARS
+        # Created lazily so it binds to the running event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.summary_store = SummaryStore()
+        self.model_id = getattr(self.model, "model", None) or "default"
+
+    async def _generate(self, prompt: str) -> str:
+        """Single model call, bounded by the shared concurrency semaphore"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.settings.SUMMARY_MAX_CONCURRENCY)
+        async with self._semaphore:
+            response = await self.client.call(
+                lambda: self.model.ainvoke(prompt),
+                estimated_tokens=estimate_tokens(prompt, self._max_output_tokens())
+            )
+            return response.content
+
+    def _max_output_tokens(self) -> int:
+        return getattr(self.model, "max_tokens", None) or 1024
+
+    async def _cached_generate(self, kind: str, text: str, prompt: str) -> str:
+        """Reuse a stored summary of identical text, otherwise generate and store it"""
+        digest = content_hash(text)
+        cached = await self.summary_store.aget(kind, digest, SUMMARY_PROMPT_VERSION, self.model_id)
+        if cached:
+            return cached["summary"]
+        summary = await self._generate(prompt + text)
+        await self.summary_store.aput(kind, digest, SUMMARY_PROMPT_VERSION, self.model_id, summary)
+        return summary
 
-    async def generate_document_summary(self, document_content: str, pdf_path: Optional[str] = None) -> Dict:
-        """Generate a comprehensive document summary"""
+    @staticmethod
+    def _is_boundary(text: str) -> bool:
+        return int(content_hash(text)[:8], 16) % CHUNK_BOUNDARY_MODULUS == 0
+
+    def _pack(self, items: List[str], limit: int) -> List[List[str]]:
+        """Pack consecutive items into groups of at most ``limit`` characters.
+
+        A group also ends after any item whose hash marks a boundary. Group
+        edges therefore depend on content, not only on running length, and an
+        edit early in the document only regroups items up to the next such
+        boundary; the groups after it, and their stored summaries, are unchanged.
+        """
+        groups, current, current_size = [], [], 0
+        for item in items:
+            if current and current_size + len(item) > limit:
+                groups.append(current)
+                current, current_size = [], 0
+            current.append(item)
+            current_size += len(item)
+            if self._is_boundary(item):
+                groups.append(current)
+                current, current_size = [], 0
+        if current:
+            groups.append(current)
+        return groups
+
+    def _chunk_sections(self, sections: List[str]) -> List[str]:
+        """Chunks made of whole pages or paragraphs; only oversized ones are split"""
+        pieces = []
+        for section in sections:
+            if len(section) > self.chunk_size:
+                pieces.extend(self.text_splitter.split_text(section))
+            elif section:
+                pieces.append(section)
+        return ["\n\n".join(group) for group in self._pack(pieces, self.chunk_size)]
+
+    def _group_for_context(self, summaries: List[str]) -> List[List[str]]:
+        """Pack consecutive summaries into groups that fit the model context"""
+        return self._pack(summaries, self.context_chars)
+
+    async def _map_reduce(self, sections: List[str]) -> Dict:
+        """Summarize chunks and merge them until a single summary remains"""
+        chunks = self._chunk_sections(sections)
+        
+        # Map: summarize every chunk concurrently; unchanged chunks come from the store
+        map_started = time.perf_counter()
+        summaries = await asyncio.gather(*[
+            self._cached_generate("map", chunk, CHUNK_SUMMARY_PROMPT) for chunk in chunks
+        ])
+        stages = [{
+            "stage": "map",
+            "inputs": len(chunks),
+            "outputs": len(summaries),
+            "seconds": round(time.perf_counter() - map_started, 3)
+        }]
+        
+        # Reduce: merge groups that fit the context until one summary remains
+        reduce_round = 0
+        while len(summaries) > 1:
+            reduce_round += 1
+            round_started = time.perf_counter()
+            groups = self._group_for_context(summaries)
+            if len(groups) == len(summaries):
+                # Every summary fills the context on its own; pair them up to keep shrinking
+                groups = [summaries[idx:idx + 2] for idx in range(0, len(summaries), 2)]
+            reduced = await asyncio.gather(*[
+                self._cached_generate("reduce", "\n\n---\n\n".join(group), REDUCE_SUMMARY_PROMPT)
+                for group in groups
+            ])
+            stages.append({
+                "stage": f"reduce_{reduce_round}",
+                "inputs": len(summaries),
+                "outputs": len(reduced),
+                "seconds": round(time.perf_counter() - round_started, 3)
+            })
+            summaries = reduced
+        
+        return {
+            "merged_summary": summaries[0] if summaries else "",
+            "chunks_processed": len(chunks),
+            "reduce_rounds": reduce_round,
+            "stages": stages
+        }
+
+    async def _load_sections(self, document_content: Optional[str], pdf_path: Optional[str]) -> List[str]:
+        """Pages of the PDF, or paragraphs of the given text"""
+        if document_content is not None:
+            return [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(document_content) if paragraph.strip()]
+        if not pdf_path:
+            raise ValueError("Either document_content or pdf_path is required")
+        # PyMuPDF parsing is blocking
+        return await asyncio.get_running_loop().run_in_executor(None, self._extract_pages, pdf_path)
+
+    def _extract_pages(self, pdf_path: str) -> List[str]:
+        return [text for _, text in self.text_extractor.iter_page_texts(pdf_path)]
+
+    async def _cached_document_summary(self, document_digest: str) -> Optional[Dict]:
+        cached = await self.summary_store.aget(
+            "document", document_digest, SUMMARY_PROMPT_VERSION, self.model_id
+        )
+        if not cached:
+            return None
+        return {
+            "summary": cached["summary"],
+            "metadata": {
+                **cached["metadata"],
+                "cached": True,
+                "cached_at": cached["created_at"]
+            }
+        }
+
+    async def _store_document_summary(self, document_digest: str, summary: str, reduction: Dict, stages: List[Dict], started: float) -> Dict:
+        metadata = {
+            "chunks_processed": reduction["chunks_processed"],
+            "reduce_rounds": reduction["reduce_rounds"],
+            "stages": stages,
+            "total_seconds": round(time.perf_counter() - started, 3),
+            "text_processed": True,
+            "generated_at": str(datetime.now()),
+            "model": self.model_id,
+            "prompt_version": SUMMARY_PROMPT_VERSION
+        }
+        await self.summary_store.aput(
+            "document", document_digest, SUMMARY_PROMPT_VERSION, self.model_id, summary, metadata
+        )
+        return {**metadata, "cached": False}
+
+    async def generate_document_summary(
+        self,
+        document_content: Optional[str] = None,
+        pdf_path: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> Dict:
+        """Generate a comprehensive document summary with map-reduce over chunks"""
+        return await self.single_flight.do(
+            "document_summary",
+            document_id,
+            lambda: self._generate_document_summary(document_content, pdf_path),
+            params={
+                "pdf_path": pdf_path,
+                "content_hash": content_hash(document_content) if document_content is not None else None
+            }
+        )
+
+    async def _generate_document_summary(self, document_content: Optional[str], pdf_path: Optional[str]) -> Dict:
         try:
-            # Split text into chunks if it's too long
-            chunks = self.text_splitter.split_text(document_content)
+            started = time.perf_counter()
+            sections = await self._load_sections(document_content, pdf_path)
             
-            # Generate summary prompt
-            summary_prompt = (
-                "Generate a comprehensive summary of this document, "
-                "including key findings, methodology, and conclusions. "
-                "Format the response with clear sections."
-            )
+            # Unchanged documents are served from the summary store without any model call
+            document_digest = content_hash("\n\n".join(sections))
+            cached = await self._cached_document_summary(document_digest)
+            if cached:
+                return cached
             
-            # Generate summary using the NVIDIA model
-            summary = await self.model.agenerate(
-                [summary_prompt + "\n\nDocument: " + chunk for chunk in chunks]
+            reduction = await self._map_reduce(sections)
+            
+            # Final pass shapes the merged summary into the report format
+            final_started = time.perf_counter()
+            summary = await self._generate(
+                FINAL_SUMMARY_PROMPT + "\n\nDocument: " + reduction["merged_summary"]
             )
+            stages = reduction["stages"] + [{
+                "stage": "final",
+                "inputs": 1,
+                "outputs": 1,
+                "seconds": round(time.perf_counter() - final_started, 3)
+            }]
 
             return {
-                "summary": summary.generations[0][0].text,
-                "metadata": {
-                    "chunks_processed": len(chunks),
-                    "text_processed": True,
-                    "generated_at": str(datetime.now())
-                }
+                "summary": summary,
+                "metadata": await self._store_document_summary(
+                    document_digest, summary, reduction, stages, started
+                )
             }
 
         except Exception as e:
             raise Exception(f"Error generating summary: {str(e)}")
 
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield model tokens as they arrive, bounded by the concurrency semaphore"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.settings.SUMMARY_MAX_CONCURRENCY)
+        async with self._semaphore:
+            async for chunk in self.client.stream(
+                lambda: self.model.astream(prompt),
+                estimated_tokens=estimate_tokens(prompt, self._max_output_tokens())
+            ):
+                if chunk.content:
+                    yield chunk.content
+
+    async def stream_document_summary(
+        self,
+        document_content: Optional[str] = None,
+        pdf_path: Optional[str] = None,
+        result: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Stream the final summary pass token by token.
+
+        Map and reduce still run to completion first; ``result`` (if given) is
+        filled with the full summary and metadata once the stream ends.
+        """
+        try:
+            started = time.perf_counter()
+            sections = await self._load_sections(document_content, pdf_path)
+            
+            document_digest = content_hash("\n\n".join(sections))
+            cached = await self._cached_document_summary(document_digest)
+            if cached:
+                if result is not None:
+                    result.update(cached)
+                yield cached["summary"]
+                return
+            
+            reduction = await self._map_reduce(sections)
+            
+            final_started = time.perf_counter()
+            tokens = []
+            async for token in self._stream(
+                FINAL_SUMMARY_PROMPT + "\n\nDocument: " + reduction["merged_summary"]
+            ):
+                tokens.append(token)
+                yield token
+            summary = "".join(tokens)
+            stages = reduction["stages"] + [{
+                "stage": "final",
+                "inputs": 1,
+                "outputs": 1,
+                "seconds": round(time.perf_counter() - final_started, 3)
+            }]
+            
+            metadata = await self._store_document_summary(document_digest, summary, reduction, stages, started)
+            if result is not None:
+                result.update({"summary": summary, "metadata": metadata})
+
+        except Exception as e:
+            raise Exception(f"Error generating summary: {str(e)}")
+
     async def generate_research_note_summary(self, qa_interactions: List[Dict]) -> str:
         """Generate a summary from Q&A interactions"""
         try:
-            # Prepare context from Q&A interactions
-            qa_context = "\n\n".join([
-                f"Q: {qa['question']}\nA: {qa['answer']}"
-                for qa in qa_interactions
-            ])
+            return await self._generate(self._research_note_prompt(qa_interactions))
 
-            research_note_prompt = (
-                "Based on the following Q&A interactions, provide a coherent "
-                "research note that synthesizes the key insights and findings. "
-                "Include relevant cross-references and maintain academic tone.\n\n"
-                f"Q&A Context:\n{qa_context}"
-            )
-            
-            response = await self.model.agenerate([research_note_prompt])
-            return response.generations[0][0].text
+        except Exception as e:
+            raise Exception(f"Error generating research note summary: {str(e)}")
 
+    async def stream_research_note_summary(self, qa_interactions: List[Dict]) -> AsyncIterator[str]:
+        """Stream a research note summary token by token"""
+        try:
+            async for token in self._stream(self._research_note_prompt(qa_interactions)):
+                yield token
         except Exception as e:
             raise Exception(f"Error generating research note summary: {str(e)}")
 
+    def _research_note_prompt(self, qa_interactions: List[Dict]) -> str:
+        # Prepare context from Q&A interactions
+        qa_context = "\n\n".join([
+            f"Q: {qa['question']}\nA: {qa['answer']}"
+            for qa in qa_interactions
+        ])
+
+        return (
+            "Based on the following Q&A interactions, provide a coherent "
+            "research note that synthesizes the key insights and findings. "
+            "Include relevant cross-references and maintain academic tone.\n\n"
+            f"Q&A Context:\n{qa_context}"
+        )
+
     async def analyze_content_trend(self, contents: List[str]) -> Dict:
         """Analyze trends in content"""
         try:
@@ -81,8 +364,7 @@ class SummarizationService:
                 f"Content:\n{combined_content}"
             )
             
-            response = await self.model.agenerate([trend_prompt])
-            analysis = response.generations[0][0].text
+            analysis = await self._generate(trend_prompt)
             
             return {
                 "trend_summary": analysis,
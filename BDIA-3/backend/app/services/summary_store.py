@@ -0,0 +1,105 @@
+from typing import Dict, Optional
+from datetime import datetime
+import asyncio
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+from app.config.settings import Settings
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """Persistent summaries keyed by (kind, content hash, prompt version, model id).
+
+    ``kind`` separates whole-document summaries from chunk-level ("map") and
+    merge-level ("reduce") summaries, so an edited section only invalidates
+    the pieces whose text actually changed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.settings = Settings()
+        self.path = Path(path or self.settings.SUMMARY_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                kind TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                metadata TEXT,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (kind, content_hash, prompt_version, model_id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, kind: str, digest: str, prompt_version: str, model_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT summary, metadata, created_at FROM summaries
+                WHERE kind = ? AND content_hash = ? AND prompt_version = ? AND model_id = ?
+                """,
+                (kind, digest, prompt_version, model_id)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "summary": row[0],
+            "metadata": json.loads(row[1]) if row[1] else {},
+            "created_at": row[2]
+        }
+
+    def put(
+        self,
+        kind: str,
+        digest: str,
+        prompt_version: str,
+        model_id: str,
+        summary: str,
+        metadata: Optional[Dict] = None
+    ):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO summaries
+                (kind, content_hash, prompt_version, model_id, summary, metadata, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    kind, digest, prompt_version, model_id, summary,
+                    json.dumps(metadata, default=str) if metadata else None,
+                    datetime.now().isoformat()
+                )
+            )
+            self._conn.commit()
+
+    # sqlite reads and commits block, so async callers run them in the default executor
+    async def aget(self, kind: str, digest: str, prompt_version: str, model_id: str) -> Optional[Dict]:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get, kind, digest, prompt_version, model_id
+        )
+
+    async def aput(
+        self,
+        kind: str,
+        digest: str,
+        prompt_version: str,
+        model_id: str,
+        summary: str,
+        metadata: Optional[Dict] = None
+    ):
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.put, kind, digest, prompt_version, model_id, summary, metadata
+        )
@@ -1,6 +1,7 @@
 from typing import Dict, List, Optional
 from datetime import datetime
 from ..models.qa import ResearchNote
+from .semantic_answer_cache import get_semantic_answer_cache
 
 class ValidationService:
     def __init__(self):
@@ -39,6 +40,8 @@ class ValidationService:
                     
                     # Remove from pending
                     self.pending_validations[doc_id].remove(note)
+                    if is_valid:
+                        get_semantic_answer_cache().invalidate(doc_id)
                     return note
         
         raise Exception("Note not found in pending validations")
@@ -9,6 +9,10 @@ from typing import List, Dict, Optional
 import numpy as np
 from datetime import datetime
 import pickle
+import uuid
+from .note_trend_index import get_note_trend_index
+from .nemo_multimodal_service import NeMoMultimodalService
+from .semantic_answer_cache import get_semantic_answer_cache
 
 class VectorStoreService:
     def __init__(self):
@@ -17,7 +21,15 @@ class VectorStoreService:
         self.document_indices = {}
         self.research_notes_indices = {}
         self.document_chunks = {}
+        # Shared by every instance so notes added through any router show up in trends
+        self.note_trends = get_note_trend_index()
         self.chunk_size = 500  # Default chunk size
+        self.answer_cache = get_semantic_answer_cache()
+
+    def _index_changed(self, document_id: str):
+        """Drop answers and context embeddings derived from a document's previous index"""
+        self.answer_cache.invalidate(document_id)
+        NeMoMultimodalService.invalidate_document_context(document_id)
 
     async def add_document(self, document_id: str, content: str, metadata: Optional[Dict] = None):
         """Add document to vector store"""
@@ -39,6 +51,7 @@ class VectorStoreService:
                 storage_context=self.storage_context,
                 service_context=self.service_context
             )
+            self._index_changed(document_id)
             
         except Exception as e:
             raise Exception(f"Error adding document to vector store: {str(e)}")
@@ -99,13 +112,18 @@ class VectorStoreService:
     ):
         """Add research note to vector store"""
         try:
+            note_id = (metadata or {}).get("note_id") or str(uuid.uuid4())
+            # Embed once; the index and the trend aggregates share the vector
+            embedding = await self.service_context.embed_model.aget_text_embedding(note)
             node = Node(
                 text=note,
+                embedding=embedding,
                 metadata={
                     "document_id": document_id,
                     "timestamp": timestamp.isoformat(),
                     "type": "research_note",
-                    **(metadata or {})
+                    **(metadata or {}),
+                    "note_id": note_id
                 }
             )
             
@@ -117,6 +135,15 @@ class VectorStoreService:
                 )
             else:
                 self.document_indices[document_id].insert_nodes([node])
+
+            self.note_trends.add_note(
+                document_id=document_id,
+                note_id=note_id,
+                timestamp=timestamp,
+                embedding=embedding,
+                verified=bool((metadata or {}).get("verified", False))
+            )
+            self._index_changed(document_id)
                 
         except Exception as e:
             raise Exception(f"Error adding research note: {str(e)}")
@@ -125,20 +152,27 @@ class VectorStoreService:
         self,
         document_id: str,
         note_id: str,
-        new_content: str
+        new_content: str,
+        timestamp: Optional[datetime] = None,
+        verified: Optional[bool] = None
     ):
-        """Update existing research note"""
+        """Update existing research note, keeping its original timestamp and verified flag"""
         try:
             if document_id not in self.document_indices:
                 raise Exception("Document not found in vector store")
                 
+            previous = self.note_trends.get_note(note_id) or {}
+            if timestamp is None:
+                timestamp = previous.get("timestamp") or datetime.utcnow()
+            if verified is None:
+                verified = previous.get("verified", False)
             # Remove old note and add updated one
             await self.remove_research_note(document_id, note_id)
             await self.add_research_note(
                 document_id=document_id,
                 note=new_content,
-                timestamp=datetime.utcnow(),
-                metadata={"note_id": note_id}
+                timestamp=timestamp,
+                metadata={"note_id": note_id, "verified": verified}
             )
             
         except Exception as e:
@@ -147,6 +181,7 @@ class VectorStoreService:
     async def remove_research_note(self, document_id: str, note_id: str):
         """Remove research note from vector store"""
         try:
+            self.note_trends.remove_note(note_id)
             if document_id not in self.document_indices:
                 return
                 
@@ -163,6 +198,7 @@ class VectorStoreService:
                 storage_context=self.storage_context,
                 service_context=self.service_context
             )
+            self._index_changed(document_id)
             
         except Exception as e:
             raise Exception(f"Error removing research note: {str(e)}")
@@ -181,6 +217,8 @@ class VectorStoreService:
             indices = pickle.load(f)
             self.document_indices = indices['documents']
             self.research_notes_indices = indices['notes']
+        for document_id in set(self.document_indices) | set(self.research_notes_indices):
+            self._index_changed(document_id)
 
     async def chunk_document(self, content: str) -> List[Dict]:
         """Chunk document for efficient processing"""
@@ -222,6 +260,7 @@ class VectorStoreService:
             storage_context=self.storage_context,
             service_context=self.service_context
         )
+        self._index_changed(document_id)
 
     async def create_research_notes_index(self, document_id: str, notes: List[str]):
         """Create or update research notes index"""
@@ -230,4 +269,5 @@ class VectorStoreService:
             documents,
             storage_context=self.storage_context,
             service_context=self.service_context
-        )
\ No newline at end of file
+        )
+        self.answer_cache.invalidate(document_id)
\ No newline at end of file
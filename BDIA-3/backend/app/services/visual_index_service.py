@@ -0,0 +1,198 @@
+from typing import Dict, List, Optional
+from pathlib import Path
+import asyncio
+import json
+from PIL import Image
+from app.config.settings import Settings
+from ..models.document import Document
+from .page_salience import CAPTION_PATTERN, LAYOUT_SUPPORT, PageSalienceScorer
+from .index_cache import IndexCache, path_size
+from .inference_executor import InferenceQueueFullError
+from .nemo_multimodal_service import NeMoMultimodalService
+from .single_flight import get_single_flight
+
+if LAYOUT_SUPPORT:
+    import fitz  # PyMuPDF
+
+
+class VisualIndexService:
+    """Per-document index of figures and tables detected once at ingestion.
+
+    Each element records page, bbox, caption and embedding so search, QA and
+    reports can look visuals up instead of re-running vision models.
+    Loaded indices are shared across service instances in a size-bounded
+    cache and reloaded when the index file is rewritten by another worker.
+    """
+
+    # document_id -> (index file mtime, elements)
+    _cache: Optional[IndexCache] = None
+
+    def __init__(self, nemo_service=None):
+        self.settings = Settings()
+        if VisualIndexService._cache is None:
+            VisualIndexService._cache = IndexCache(self.settings.VISUAL_INDEX_CACHE_MAX_BYTES)
+        self.nemo_service = nemo_service
+        self.single_flight = get_single_flight()
+        self.index_path = Path(self.settings.VISUAL_INDEX_PATH)
+        self.render_dpi = 96
+        self.min_region_fraction = 0.02
+        self.page_scorer = PageSalienceScorer()
+
+    async def index_document(self, document: Document) -> List[Dict]:
+        """Detect figures and tables in the document PDF, embed them and persist the index"""
+        # Concurrent builds of the same document share one pass over the PDF
+        return await self.single_flight.do(
+            "visual_index",
+            document.id,
+            lambda: self._index_document(document),
+            params={"pdf_link": document.pdf_link}
+        )
+
+    async def ensure_index(self, document: Document) -> bool:
+        """Build the index for a newly processed document unless it already has one.
+
+        Meant to run as a background task, so failures are reported rather than raised.
+        """
+        if not document.pdf_link or self._file_for(document.id).exists():
+            return False
+        try:
+            await self.index_document(document)
+            return True
+        except Exception as e:
+            print(f"Warning: could not build visual index for {document.id}: {str(e)}")
+            return False
+
+    async def _index_document(self, document: Document) -> List[Dict]:
+        try:
+            if self.nemo_service is None:
+                raise Exception("A NeMo service is required to build visual indices")
+
+            loop = asyncio.get_running_loop()
+            regions = await loop.run_in_executor(None, self._detect_regions, document.pdf_link)
+
+            elements = []
+            for idx, region in enumerate(regions, 1):
+                embedding = await self.nemo_service.embed_image(region.pop("image"))
+                elements.append({
+                    "id": f"{document.id}-{idx}",
+                    "document_id": document.id,
+                    "source": f"{document.pdf_link}#page={region['page']}",
+                    **region,
+                    "embedding": [float(value) for value in embedding.flatten().tolist()]
+                })
+
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            path = self._file_for(document.id)
+            with open(path, "w") as f:
+                json.dump(elements, f)
+            self._cache.put(document.id, (path.stat().st_mtime_ns, elements), path_size(path))
+            # Context embeddings built from the previous visuals are stale now
+            NeMoMultimodalService.invalidate_document_context(document.id)
+            return elements
+        except InferenceQueueFullError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error indexing visual elements: {str(e)}")
+
+    async def get_visual_elements(self, document_id: str, page: Optional[int] = None) -> List[Dict]:
+        """Look up indexed visual elements for a document, optionally for one page"""
+        path = self._file_for(document_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._cache.invalidate(document_id)
+            return []
+
+        entry = self._cache.get(document_id)
+        if entry is not None and entry[0] == mtime:
+            elements = entry[1]
+        else:
+            # Not loaded yet, or rebuilt since we loaded it
+            with open(path) as f:
+                elements = json.load(f)
+            self._cache.put(document_id, (mtime, elements), path_size(path))
+
+        if page is None:
+            return elements
+        return [element for element in elements if element["page"] == page]
+
+    def invalidate(self, document_id: str):
+        self._cache.invalidate(document_id)
+
+    def _file_for(self, document_id: str) -> Path:
+        return self.index_path / f"{document_id}.json"
+
+    def _detect_regions(self, pdf_path: str) -> List[Dict]:
+        if not LAYOUT_SUPPORT:
+            return self._salient_page_regions(pdf_path)
+
+        regions = []
+        with fitz.open(pdf_path) as doc:
+            for page_number, page in enumerate(doc, 1):
+                min_area = abs(page.rect) * self.min_region_fraction
+                captions = [
+                    (fitz.Rect(block[:4]), block[4].strip())
+                    for block in page.get_text("blocks")
+                    if CAPTION_PATTERN.match(block[4].strip())
+                ]
+
+                candidates = []
+                if hasattr(page, "find_tables"):
+                    candidates += [("table", fitz.Rect(table.bbox)) for table in page.find_tables().tables]
+                for info in page.get_images(full=True):
+                    candidates += [("figure", rect) for rect in page.get_image_rects(info[0])]
+
+                drawing_rects = [
+                    drawing["rect"] for drawing in page.get_drawings()
+                    if not any(drawing["rect"].intersects(rect) for _, rect in candidates)
+                ]
+                if len(drawing_rects) >= 10:
+                    chart_rect = fitz.Rect(drawing_rects[0])
+                    for rect in drawing_rects[1:]:
+                        chart_rect |= rect
+                    candidates.append(("graph", chart_rect))
+
+                for element_type, rect in candidates:
+                    if abs(rect) < min_area:
+                        continue
+                    regions.append({
+                        "type": element_type,
+                        "page": page_number,
+                        "bbox": [rect.x0, rect.y0, rect.x1, rect.y1],
+                        "caption": self._nearest_caption(rect, captions),
+                        "image": self._render(page, rect)
+                    })
+        return regions
+
+    def _salient_page_regions(self, pdf_path: str) -> List[Dict]:
+        """Without layout support, index the most visual pages as whole-page figures"""
+        from pdf2image import convert_from_path
+
+        regions = []
+        for page_number in self.page_scorer.select_pages(pdf_path, top_k=5):
+            image = convert_from_path(
+                pdf_path, dpi=self.render_dpi, first_page=page_number, last_page=page_number
+            )[0]
+            regions.append({
+                "type": "figure",
+                "page": page_number,
+                "bbox": None,
+                "caption": None,
+                "image": image
+            })
+        return regions
+
+    @staticmethod
+    def _nearest_caption(rect, captions: List) -> Optional[str]:
+        if not captions:
+            return None
+        distance = lambda caption_rect: min(
+            abs(caption_rect.y0 - rect.y1),
+            abs(rect.y0 - caption_rect.y1)
+        )
+        caption_rect, text = min(captions, key=lambda caption: distance(caption[0]))
+        return text if distance(caption_rect) <= 72 else None
+
+    def _render(self, page, rect) -> Image.Image:
+        pixmap = page.get_pixmap(clip=rect, dpi=self.render_dpi)
+        return Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from app.config.settings import settings
+from .storage_backend import get_storage_backend
+
+# The spill file is rewritten once it holds this many times more rows than are pending,
+# so each rewrite is paid for by as many appends and the cost stays linear under backlog
+SPILL_COMPACT_RATIO = 4
+
+
+class WriteBehindBuffer:
+    """Batches INSERT rows and writes them with one ``executemany`` per statement.
+
+    Rows are flushed when a statement has ``max_rows`` pending or every
+    ``max_delay`` seconds. Each row is appended to a local spill file before
+    it is buffered and acknowledged there once written. The file is
+    truncated whenever nothing is pending and otherwise rewritten with only
+    the pending rows once it has grown to ``SPILL_COMPACT_RATIO`` times
+    their number. Each process spills to its own file in ``spill_dir``;
+    ``recover`` replays the unacknowledged rows of its own file and of files
+    left behind by dead processes, so rows buffered by a worker that crashed
+    are written on the next start. Delivery is at-least-once: a crash
+    between a flush and its acknowledgement replays those rows.
+
+    ``add`` waits for a flush once ``max_pending`` rows are buffered, and
+    rows whose flush failed ``max_attempts`` times are moved to a dead-letter
+    file instead of being retried forever.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[str, List[Sequence]], Awaitable[None]],
+        spill_dir: str,
+        max_rows: int = 500,
+        max_delay: float = 2.0,
+        max_pending: int = 20000,
+        max_attempts: int = 5
+    ):
+        self._flush_func = flush_func
+        self.spill_dir = Path(spill_dir)
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.spill_path = self.spill_dir / f"write_buffer_{os.getpid()}.jsonl"
+        self.dead_letter_path = self.spill_dir / f"dead_letter_{os.getpid()}.jsonl"
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        # statement -> [(row id, row)] in arrival order
+        self._pending: "OrderedDict[str, List[Tuple[int, Sequence]]]" = OrderedDict()
+        self._pending_rows = 0
+        # row id -> failed flushes, for rows that failed at least once
+        self._attempts: Dict[int, int] = {}
+        self._next_id = 0
+        self._file_lock = threading.Lock()
+        self._spill = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_rows = 0
+        # Created lazily so they bind to the running event loop
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._flushed_rows = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._dead_lettered_rows = 0
+
+    async def add(self, statement: str, row: Sequence):
+        """Buffer one row for ``statement``; returns once the row is in the spill file"""
+        # Back-pressure: callers wait while the warehouse is behind instead of growing memory
+        while self._pending_rows >= self.max_pending:
+            await self.flush()
+            if self._pending_rows >= self.max_pending:
+                await asyncio.sleep(self.max_delay)
+
+        row_id = self._next_id
+        self._next_id += 1
+        self._append_spill({"id": row_id, "statement": statement, "row": list(row)})
+        self._pending.setdefault(statement, []).append((row_id, row))
+        self._pending_rows += 1
+
+        self._ensure_timer()
+        # Only the row that fills a batch schedules a flush; the timer retries failures
+        if len(self._pending[statement]) == self.max_rows:
+            asyncio.ensure_future(self.flush(statement))
+
+    async def flush(self, statement: Optional[str] = None):
+        """Write pending rows (for one statement, or all of them) to the warehouse"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            statements = [statement] if statement else list(self._pending)
+            for current in statements:
+                batch = self._pending.pop(current, None)
+                if not batch:
+                    continue
+                self._pending_rows -= len(batch)
+                try:
+                    await self._flush_func(current, [row for _, row in batch])
+                except Exception as e:
+                    self._failed_flushes += 1
+                    retry = self._record_failure(current, batch, str(e))
+                    # Keep the rows (ahead of newer ones) for the next attempt
+                    self._pending[current] = retry + self._pending.get(current, [])
+                    self._pending_rows += len(retry)
+                    if len(retry) < len(batch):
+                        # Dead-lettered rows are acknowledged so they are not replayed
+                        retried = {row_id for row_id, _ in retry}
+                        self._append_spill({"ack": [row_id for row_id, _ in batch if row_id not in retried]})
+                    print(f"Warning: buffered write flush failed, will retry: {str(e)}")
+                    continue
+                for row_id, _ in batch:
+                    self._attempts.pop(row_id, None)
+                self._append_spill({"ack": [row_id for row_id, _ in batch]})
+                self._flushed_rows += len(batch)
+                self._flushes += 1
+                self._compact_spill()
+
+    async def recover(self):
+        """Re-buffer spilled rows that were never acknowledged, then flush them"""
+        records = []
+        with self._file_lock:
+            self._spill.flush()
+            records.extend(self._read_spill(self.spill_path))
+            self._truncate_spill()
+        claimed = []
+        for orphan in self.spill_dir.glob("write_buffer_*.jsonl"):
+            if orphan == self.spill_path or self._owner_alive(orphan):
+                continue
+            # The rename is atomic, so workers starting together never replay a file twice
+            claim = orphan.with_name(f"{orphan.name}.recovering-{os.getpid()}")
+            try:
+                orphan.rename(claim)
+            except OSError:
+                continue
+            records.extend(self._read_spill(claim))
+            claimed.append(claim)
+
+        for record in records:
+            await self.add(record["statement"], record["row"])
+        # Replayed rows are in our own spill file now
+        for claim in claimed:
+            claim.unlink()
+        await self.flush()
+
+    @staticmethod
+    def _read_spill(path: Path) -> List[Dict]:
+        records, acked = [], set()
+        with open(path, "r", encoding="utf-8") as spill:
+            for line in spill:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash
+                if "ack" in record:
+                    acked.update(record["ack"])
+                else:
+                    records.append(record)
+        return [record for record in records if record["id"] not in acked]
+
+    def _record_failure(self, statement: str, batch: List[Tuple[int, Sequence]], error: str) -> List[Tuple[int, Sequence]]:
+        """Count a failed flush against each row; returns the rows still worth retrying"""
+        retry, dead = [], []
+        for row_id, row in batch:
+            attempts = self._attempts.get(row_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self._attempts.pop(row_id, None)
+                dead.append(row)
+            else:
+                self._attempts[row_id] = attempts
+                retry.append((row_id, row))
+        if dead:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letter:
+                for row in dead:
+                    dead_letter.write(json.dumps({"statement": statement, "row": list(row), "error": error}, default=str) + "\n")
+            self._dead_lettered_rows += len(dead)
+            print(f"Warning: {len(dead)} buffered rows failed {self.max_attempts} flushes, moved to {self.dead_letter_path}")
+        return retry
+
+    @staticmethod
+    def _owner_alive(path: Path) -> bool:
+        try:
+            os.kill(int(path.stem.rsplit("_", 1)[1]), 0)
+        except ValueError:
+            return True  # not one of ours; leave it alone
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "pending_rows": self._pending_rows,
+            "flushed_rows": self._flushed_rows,
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+            "dead_lettered_rows": self._dead_lettered_rows
+        }
+
+    def _ensure_timer(self):
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.ensure_future(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.max_delay)
+            if self._pending:
+                await self.flush()
+
+    def _append_spill(self, record: Dict):
+        with self._file_lock:
+            self._spill.write(json.dumps(record, default=str) + "\n")
+            self._spill_rows += 1
+            # Reaching the OS is enough to survive a process crash
+            self._spill.flush()
+
+    def _compact_spill(self):
+        """Drop written rows from the spill file once they dominate it"""
+        with self._file_lock:
+            if not self._pending:
+                self._truncate_spill()
+                return
+            if self._spill_rows <= SPILL_COMPACT_RATIO * self._pending_rows:
+                return
+            self._spill.close()
+            # Written beside the spill file and swapped in, so a crash keeps the old copy
+            compacted = self.spill_path.with_name(f"{self.spill_path.name}.tmp")
+            with open(compacted, "w", encoding="utf-8") as spill:
+                for statement, batch in self._pending.items():
+                    for row_id, row in batch:
+                        spill.write(json.dumps({"id": row_id, "statement": statement, "row": list(row)}, default=str) + "\n")
+            os.replace(compacted, self.spill_path)
+            self._spill = open(self.spill_path, "a", encoding="utf-8")
+            self._spill_rows = self._pending_rows
+
+    def _truncate_spill(self):
+        self._spill.close()
+        self._spill = open(self.spill_path, "w", encoding="utf-8")
+        self._spill_rows = 0
+
+
+def _insert_rows(conn, statement: str, rows: List[Sequence]):
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(statement, rows)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+async def _flush_to_storage(statement: str, rows: List[Sequence]):
+    await get_storage_backend().run(_insert_rows, statement, rows)
+
+
+@lru_cache()
+def get_write_buffer() -> WriteBehindBuffer:
+    """Process-wide buffer so every service shares one batch per statement"""
+    return WriteBehindBuffer(
+        flush_func=_flush_to_storage,
+        spill_dir=settings.WRITE_BUFFER_SPILL_DIR,
+        max_rows=settings.WRITE_BUFFER_MAX_ROWS,
+        max_delay=settings.WRITE_BUFFER_MAX_DELAY_SECONDS,
+        max_pending=settings.WRITE_BUFFER_MAX_PENDING_ROWS,
+        max_attempts=settings.WRITE_BUFFER_MAX_ATTEMPTS
+    )
@@ -0,0 +1,107 @@
+"""Throughput and latency of the document embedding backends on CPU.
+
+Measures nodes per second for batched node embedding and p50/p95 latency of
+single query embeddings for the local Hugging Face model and the ONNX
+Runtime export (fp32 and int8). Run from the backend directory:
+
+    python -m benchmarks.embedding_backends --export --nodes 256 --queries 50
+"""
+import argparse
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+from llama_index.embeddings import HuggingFaceEmbedding
+
+from app.config.settings import Settings
+from app.services.embedding_backends import ONNXEmbedding, export_onnx_model
+
+SAMPLE_PARAGRAPH = (
+    "The research foundation examined how asset allocation decisions respond to "
+    "changes in inflation expectations, finding that investors with longer horizons "
+    "rebalanced towards real assets while shorter horizon portfolios increased cash. "
+)
+SAMPLE_QUERIES = [
+    "What is the main conclusion of the report?",
+    "How does inflation affect asset allocation?",
+    "Which portfolios increased their cash holdings?",
+]
+
+
+def _node_texts(count: int) -> List[str]:
+    return [f"Section {idx}. " + SAMPLE_PARAGRAPH * 4 for idx in range(count)]
+
+
+def _bench(model, nodes: List[str], queries: int) -> Dict:
+    model.get_text_embedding_batch(nodes[:model.embed_batch_size])  # warm-up
+
+    start = time.perf_counter()
+    node_embeddings = model.get_text_embedding_batch(nodes)
+    nodes_per_second = len(nodes) / (time.perf_counter() - start)
+
+    latencies = []
+    for idx in range(queries):
+        query = SAMPLE_QUERIES[idx % len(SAMPLE_QUERIES)]
+        start = time.perf_counter()
+        model.get_query_embedding(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    return {
+        "nodes_per_second": nodes_per_second,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)],
+        "embeddings": np.asarray(node_embeddings, dtype=np.float32)
+    }
+
+
+def _mean_cosine(reference: np.ndarray, candidate: np.ndarray) -> float:
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return float((reference * candidate).sum(axis=1).mean())
+
+
+def run(node_count: int, queries: int, batch_size: int, export: bool):
+    settings = Settings()
+    if export:
+        export_onnx_model(settings.EMBED_MODEL_NAME, settings.EMBED_ONNX_PATH, quantize=True)
+
+    backends = {
+        "local (HF)": lambda: HuggingFaceEmbedding(
+            model_name=settings.EMBED_MODEL_NAME, embed_batch_size=batch_size
+        ),
+        "onnx fp32": lambda: ONNXEmbedding(
+            settings.EMBED_ONNX_PATH, quantized=False, embed_batch_size=batch_size
+        ),
+        "onnx int8": lambda: ONNXEmbedding(
+            settings.EMBED_ONNX_PATH, quantized=True, embed_batch_size=batch_size
+        ),
+    }
+
+    nodes = _node_texts(node_count)
+    results = {}
+    for name, build in backends.items():
+        try:
+            results[name] = _bench(build(), nodes, queries)
+        except (ImportError, OSError) as e:
+            print(f"Skipping {name}: {str(e)}")
+
+    reference = results.get("local (HF)")
+    print(f"{'backend':<12}{'nodes/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'cos vs HF':>11}")
+    for name, result in results.items():
+        agreement = _mean_cosine(reference["embeddings"], result["embeddings"]) if reference else float("nan")
+        print(
+            f"{name:<12}{result['nodes_per_second']:>10.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{agreement:>11.4f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=256, help="Number of node texts to embed")
+    parser.add_argument("--queries", type=int, default=50, help="Number of single query embeddings")
+    parser.add_argument("--batch-size", type=int, default=Settings().EMBED_BATCH_SIZE)
+    parser.add_argument("--export", action="store_true", help="Export and quantize the ONNX model first")
+    args = parser.parse_args()
+    run(args.nodes, args.queries, args.batch_size, args.export)
@@ -0,0 +1,105 @@
+"""Accuracy vs latency of the NeMo CPU inference profile.
+
+Compares the fp32 model against the int8 dynamically quantized "cpu" profile
+on encode_text and encode_image. Run from the backend directory:
+
+    python -m benchmarks.nemo_cpu_profile --runs 20 --images ./samples/*.png
+"""
+import argparse
+import glob
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import torch
+from PIL import Image
+
+from app.config.nemo_config import NeMoConfig
+from app.services.nemo_multimodal_service import NeMoMultimodalService
+
+SAMPLE_TEXTS = [
+    "What is the main conclusion of the report?",
+    "Summarize the methodology used to estimate equity risk premiums.",
+    "How did fixed income allocations change between 2020 and 2023?",
+    "List the key risks identified for emerging market investors.",
+]
+
+
+def _load_service(profile: str) -> NeMoMultimodalService:
+    service = NeMoMultimodalService(NeMoConfig(INFERENCE_PROFILE=profile))
+    if service.multimodal_model is None:
+        raise RuntimeError(f"NeMo model could not be loaded for profile '{profile}'")
+    # Compare both profiles on CPU
+    if not service.cpu_profile:
+        service.device = torch.device("cpu")
+        service.multimodal_model = service.multimodal_model.to(service.device)
+    return service
+
+
+def _load_images(patterns: List[str]) -> List[Image.Image]:
+    paths = [path for pattern in patterns for path in glob.glob(pattern)]
+    if paths:
+        return [Image.open(path).convert("RGB") for path in paths]
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 255, (224, 224, 3), dtype=np.uint8))
+        for _ in range(4)
+    ]
+
+
+def _time_calls(func: Callable, inputs: List, runs: int) -> Dict:
+    latencies = []
+    with torch.inference_mode():
+        outputs = [func(item) for item in inputs]  # warm-up, kept for accuracy
+        for _ in range(runs):
+            for item in inputs:
+                start = time.perf_counter()
+                func(item)
+                latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "outputs": outputs
+    }
+
+
+def _cosine(a: torch.Tensor, b: torch.Tensor) -> float:
+    a = torch.as_tensor(a, dtype=torch.float32).flatten()
+    b = torch.as_tensor(b, dtype=torch.float32).flatten()
+    return float(torch.nn.functional.cosine_similarity(a, b, dim=0))
+
+
+def run(runs: int, image_patterns: List[str]):
+    images = _load_images(image_patterns)
+    results = {}
+    for profile in ("default", "cpu"):
+        service = _load_service(profile)
+        model = service.multimodal_model
+        image_tensors = [model.preprocess_image(image).to(service.device) for image in images]
+        results[profile] = {
+            "encode_text": _time_calls(model.encode_text, SAMPLE_TEXTS, runs),
+            "encode_image": _time_calls(model.encode_image, image_tensors, runs)
+        }
+
+    print(f"{'method':<14}{'fp32 p50':>10}{'int8 p50':>10}{'fp32 p95':>10}{'int8 p95':>10}{'speedup':>9}{'min cos':>9}{'mean cos':>10}")
+    for method in ("encode_text", "encode_image"):
+        fp32 = results["default"][method]
+        int8 = results["cpu"][method]
+        similarities = [_cosine(a, b) for a, b in zip(fp32["outputs"], int8["outputs"])]
+        print(
+            f"{method:<14}"
+            f"{fp32['p50_ms']:>10.1f}{int8['p50_ms']:>10.1f}"
+            f"{fp32['p95_ms']:>10.1f}{int8['p95_ms']:>10.1f}"
+            f"{fp32['p50_ms'] / int8['p50_ms']:>8.2f}x"
+            f"{min(similarities):>9.4f}{statistics.mean(similarities):>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Timed passes over the inputs")
+    parser.add_argument("--images", nargs="*", default=[], help="Image paths or globs")
+    args = parser.parse_args()
+    run(args.runs, args.images)
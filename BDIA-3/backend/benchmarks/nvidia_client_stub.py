@@ -0,0 +1,134 @@
+"""Sustained throughput of the NVIDIA client against a local stub endpoint.
+
+Starts an OpenAI-compatible stub that enforces its own requests-per-minute
+limit (answering 429 with Retry-After once it is exceeded) and fires a burst
+of summary calls at it, once unthrottled and once through NVIDIAClient.
+Reports completed calls, failures, 429s seen by the server and calls per
+second. Run from the backend directory:
+
+    python -m benchmarks.nvidia_client_stub --calls 60 --server-rpm 120 --latency-ms 200
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from langchain_nvidia_ai_endpoints import ChatNVIDIA
+
+from app.services.nvidia_client import NVIDIAClient, RetryPolicy, estimate_tokens
+
+PROMPT = "Summarize this section of a research document: " + "Asset allocation shifted towards real assets. " * 40
+
+
+class StubState:
+    def __init__(self, requests_per_minute: int, latency: float):
+        self.requests_per_minute = requests_per_minute
+        self.latency = latency
+        self.accepted = deque()
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def admit(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            while self.accepted and now - self.accepted[0] > 60:
+                self.accepted.popleft()
+            if len(self.accepted) >= self.requests_per_minute:
+                self.rejected += 1
+                return False
+            self.accepted.append(now)
+            return True
+
+
+def _stub_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not state.admit():
+                self._send(429, {"detail": "Too Many Requests"}, {"Retry-After": "1"})
+                return
+            time.sleep(state.latency)
+            self._send(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "stub",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Stub summary."},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            })
+
+        def _send(self, status: int, body: Dict, headers: Dict = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+async def _burst(model: ChatNVIDIA, calls: int, client: NVIDIAClient = None) -> Dict:
+    async def one():
+        if client is None:
+            return await model.ainvoke(PROMPT)
+        return await client.call(lambda: model.ainvoke(PROMPT), estimate_tokens(PROMPT, 256))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[one() for _ in range(calls)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    completed = sum(1 for result in results if not isinstance(result, Exception))
+    return {
+        "completed": completed,
+        "failed": calls - completed,
+        "seconds": round(elapsed, 2),
+        "calls_per_second": round(completed / elapsed, 2)
+    }
+
+
+def run(calls: int, server_rpm: int, latency_ms: int, max_in_flight: int):
+    for label, use_client in (("unthrottled", False), ("nvidia_client", True)):
+        state = StubState(server_rpm, latency_ms / 1000)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(state))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        model = ChatNVIDIA(
+            api_key="stub",
+            base_url=f"http://127.0.0.1:{server.server_port}/v1",
+            model="stub"
+        )
+        client = NVIDIAClient(
+            requests_per_minute=server_rpm,
+            max_in_flight=max_in_flight,
+            retry_policy=RetryPolicy(max_retries=5, base_delay=0.5, max_delay=5)
+        ) if use_client else None
+        try:
+            result = asyncio.run(_burst(model, calls, client))
+        finally:
+            server.shutdown()
+        result["server_429s"] = state.rejected
+        if client is not None:
+            result["client"] = client.stats()
+        print(label, json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=60, help="Number of summary calls in the burst")
+    parser.add_argument("--server-rpm", type=int, default=120, help="Requests per minute the stub accepts")
+    parser.add_argument("--latency-ms", type=int, default=200, help="Simulated model latency")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    args = parser.parse_args()
+    run(args.calls, args.server_rpm, args.latency_ms, args.max_in_flight)
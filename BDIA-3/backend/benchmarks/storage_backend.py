@@ -0,0 +1,118 @@
+"""Catalog and write-path timings against the local SQLite storage backend.
+
+Seeds a throwaway SQLite database with the warehouse schema, then times a
+full keyset-paginated walk of the catalog, bulk document lookups (cold and
+cached), and Q&A logging row by row versus through the write-behind buffer.
+Needs no Snowflake account, so it can run anywhere. Run from the backend
+directory:
+
+    python -m benchmarks.storage_backend --documents 20000 --page-size 50 --lookups 2000 --writes 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_workdir = tempfile.mkdtemp(prefix="storage_benchmark_")
+# Settings are read at import time, so point them at the scratch database first
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_DATABASE_PATH"] = os.path.join(_workdir, "warehouse.sqlite")
+os.environ["WRITE_BUFFER_SPILL_DIR"] = os.path.join(_workdir, "write_buffer")
+
+from app.services.snowflake_service import QA_INTERACTION_INSERT, SnowflakeService  # noqa: E402
+from app.services.storage_backend import get_storage_backend  # noqa: E402
+from app.services.write_buffer import get_write_buffer  # noqa: E402
+
+
+def _seed(conn, documents: int):
+    start = datetime(2020, 1, 1)
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO documents (id, title, summary, image_link, pdf_link, created_at, updated_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        [
+            (
+                f"doc-{idx:07d}", f"Document {idx}", "Summary text. " * 20,
+                f"gs://bucket/images/{idx}.jpg", f"gs://bucket/pdfs/{idx}.pdf",
+                (start + timedelta(minutes=idx)).isoformat(), (start + timedelta(minutes=idx)).isoformat()
+            )
+            for idx in range(documents)
+        ]
+    )
+    conn.commit()
+    cursor.close()
+
+
+def _insert_one(conn, row):
+    cursor = conn.cursor()
+    cursor.execute(QA_INTERACTION_INSERT, row)
+    conn.commit()
+    cursor.close()
+
+
+async def _timed(coro):
+    started = time.perf_counter()
+    result = await coro
+    return result, round(time.perf_counter() - started, 3)
+
+
+async def _walk_catalog(service: SnowflakeService, page_size: int, order: str) -> int:
+    pages, cursor = 0, None
+    while True:
+        page = await service.get_document_page(limit=page_size, cursor=cursor, order=order)
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            return pages
+
+
+async def _run(documents: int, page_size: int, lookups: int, writes: int):
+    backend = get_storage_backend()
+    await backend.run(_seed, documents)
+    service = SnowflakeService()
+    results = {}
+
+    for order in ("id", "newest"):
+        pages, seconds = await _timed(_walk_catalog(service, page_size, order))
+        results[f"catalog_walk_{order}"] = {"pages": pages, "seconds": seconds}
+
+    ids = [f"doc-{random.randrange(documents):07d}" for _ in range(lookups)]
+    for label in ("lookups_cold", "lookups_cached"):
+        found, seconds = await _timed(service.get_documents(ids))
+        results[label] = {"found": len(found), "seconds": seconds}
+
+    rows = [(f"doc-{idx % documents:07d}", f"Question {idx}?", "Answer.", datetime.now().isoformat()) for idx in range(writes)]
+    _, seconds = await _timed(asyncio.gather(*[backend.run(_insert_one, row) for row in rows]))
+    results["qa_log_row_by_row"] = {"rows": writes, "seconds": seconds}
+
+    async def buffered():
+        for row in rows:
+            await service.write_buffer.add(QA_INTERACTION_INSERT, row)
+        await service.write_buffer.flush()
+
+    _, seconds = await _timed(buffered())
+    results["qa_log_buffered"] = {"rows": writes, "seconds": seconds, **get_write_buffer().stats()}
+
+    await get_write_buffer().close()
+    backend.close_all()
+    return results
+
+
+def run(documents: int, page_size: int, lookups: int, writes: int):
+    results = asyncio.run(_run(documents, page_size, lookups, writes))
+    for label, result in results.items():
+        print(label, json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000, help="Rows seeded into the documents table")
+    parser.add_argument("--page-size", type=int, default=50, help="Catalog page size")
+    parser.add_argument("--lookups", type=int, default=2000, help="Ids per bulk document lookup")
+    parser.add_argument("--writes", type=int, default=5000, help="Q&A interactions logged per strategy")
+    args = parser.parse_args()
+    run(args.documents, args.page_size, args.lookups, args.writes)
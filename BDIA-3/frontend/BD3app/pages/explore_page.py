@@ -2,6 +2,8 @@ import streamlit as st
 from utils.api_requests import fetch_documents
 from utils.navigation import navigate_to
 
+CATALOG_PAGE_SIZE = 50
+
 def render():
     # Check for API client in session state
     if 'api_client' not in st.session_state:
@@ -19,11 +21,34 @@ def render():
     # Description text
     st.markdown("<p style='text-align: center; color: #D3D3D3; font-size: 18px;'>Select a document from the dropdown below:</p>", unsafe_allow_html=True)
 
+    # Cursors of the pages visited so far; the first page has no cursor
+    if 'catalog_cursors' not in st.session_state:
+        st.session_state.catalog_cursors = [None]
+
     try:
-        # Fetch document data using API client
-        document_data = st.session_state.api_client.fetch_documents()
+        # Fetch only the current catalog page using API client
+        document_data = st.session_state.api_client.fetch_documents(
+            limit=CATALOG_PAGE_SIZE,
+            cursor=st.session_state.catalog_cursors[-1]
+        )
         documents = document_data.get("documents", [])
 
+        # Page navigation
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("⬅ Previous", key="catalog_prev", disabled=len(st.session_state.catalog_cursors) == 1):
+                st.session_state.catalog_cursors.pop()
+                st.rerun()
+        with page_col:
+            st.markdown(
+                f"<p style='text-align: center; color: #D3D3D3;'>Page {len(st.session_state.catalog_cursors)}</p>",
+                unsafe_allow_html=True
+            )
+        with next_col:
+            if st.button("Next ➡", key="catalog_next", disabled=not document_data.get("next_cursor")):
+                st.session_state.catalog_cursors.append(document_data["next_cursor"])
+                st.rerun()
+
         # Extract titles from the documents for the dropdown
         titles = [doc["title"] for doc in documents]
 
@@ -43,7 +68,7 @@ def render():
 
             # Display GCS Path with the label highlighted
             st.markdown(
-                f"<p style='font-size: 18px;'><strong style='color: #FFD700;'>GCS Path:</strong> <span style='color: #A9A9A9;'>{selected_document['pdf_gcs_path']}</span></p>",
+                f"<p style='font-size: 18px;'><strong style='color: #FFD700;'>GCS Path:</strong> <span style='color: #A9A9A9;'>{selected_document.get('pdf_gcs_path') or selected_document.get('pdf_link')}</span></p>",
                 unsafe_allow_html=True
             )
 
@@ -1,6 +1,16 @@
 import streamlit as st
 from utils.navigation import navigate_to
 
+def render_summary_box(container, summary_text: str):
+    container.markdown(
+        f"""<div style='margin-top: 10px; padding: 10px; border: 2px solid #FF6347; border-radius: 5px; background-color: #333;'>
+        <textarea style='width: 100%; height: 200px; color: #FFFFFF; background-color: #4B4B4B; resize: none; overflow-y: scroll;' readonly>
+        {summary_text}
+        </textarea>
+        </div>""",
+        unsafe_allow_html=True
+    )
+
 def render():
     # Check for API client
     if 'api_client' not in st.session_state:
@@ -47,10 +57,15 @@ def render():
                 )
 
             # Summarize Document Button with API integration
+            summary_area = st.empty()
             if st.button("Summarize Document", key="summarize_button", help="Click to generate a summary"):
                 try:
-                    summary = st.session_state.api_client.get_document_summary(document["id"])
-                    st.session_state.document_summary = summary["summary"]
+                    # Render tokens as they arrive instead of waiting for the full summary
+                    summary_text = ""
+                    for token in st.session_state.api_client.stream_document_summary(document["id"]):
+                        summary_text += token
+                        render_summary_box(summary_area, summary_text)
+                    st.session_state.document_summary = summary_text
                     st.session_state.show_summary_box = True
                 except Exception as e:
                     st.error(f"Error generating summary: {str(e)}")
@@ -58,14 +73,21 @@ def render():
             # Display summary if available
             if st.session_state.get("show_summary_box", False):
                 summary_text = st.session_state.get("document_summary", "Summary will appear here once generated...")
-                st.markdown(
-                    f"""<div style='margin-top: 10px; padding: 10px; border: 2px solid #FF6347; border-radius: 5px; background-color: #333;'>
-                    <textarea style='width: 100%; height: 200px; color: #FFFFFF; background-color: #4B4B4B; resize: none; overflow-y: scroll;' readonly>
-                    {summary_text}
-                    </textarea>
-                    </div>""",
-                    unsafe_allow_html=True
-                )
+                render_summary_box(summary_area, summary_text)
+
+            # Research summary of the Q&A so far, streamed the same way
+            research_area = st.empty()
+            if st.button("Summarize Research Notes", key="research_summary_button", help="Summarize the questions asked about this document"):
+                try:
+                    research_text = ""
+                    for token in st.session_state.api_client.stream_research_summary(document["id"]):
+                        research_text += token
+                        render_summary_box(research_area, research_text)
+                    st.session_state.research_summary = research_text
+                except Exception as e:
+                    st.error(f"Error generating research summary: {str(e)}")
+            elif st.session_state.get("research_summary"):
+                render_summary_box(research_area, st.session_state.research_summary)
 
             # Q/A Interface Button (navigates to qa_page)
             if st.button("Q/A Interface", key="qa_button", help="Go to Q/A Interface"):
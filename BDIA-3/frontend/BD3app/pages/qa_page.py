@@ -3,6 +3,17 @@
 import streamlit as st
 from utils.navigation import navigate_to
 
+def render_answer(container, answer: str, confidence=None):
+    confidence_line = f"<br><small>Confidence: {confidence:.2f}</small>" if confidence is not None else ""
+    container.markdown(
+        f"""
+        <div style='padding: 10px; background-color: #333; border-radius: 5px;'>
+            <strong>Answer:</strong> {answer}{confidence_line}
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
 def render():
     # Check for API client
     if 'api_client' not in st.session_state:
@@ -42,20 +53,17 @@ def render():
     if st.button("Ask"):
         if question:
             try:
-                # Use API client to get response
-                response = st.session_state.api_client.ask_question(
+                # Stream the answer into the placeholder as tokens arrive
+                answer = ""
+                result = {}
+                for token in st.session_state.api_client.stream_answer(
                     document["id"], 
-                    question
-                )
-                response_area.markdown(
-                    f"""
-                    <div style='padding: 10px; background-color: #333; border-radius: 5px;'>
-                        <strong>Answer:</strong> {response['answer']}<br>
-                        <small>Confidence: {response['confidence_score']:.2f}</small>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+                    question,
+                    result=result
+                ):
+                    answer += token
+                    render_answer(response_area, answer)
+                render_answer(response_area, answer, result.get("confidence_score"))
             except Exception as e:
                 response_area.error(f"Error processing question: {str(e)}")
         else:
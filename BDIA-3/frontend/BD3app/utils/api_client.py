@@ -1,5 +1,6 @@
 import requests
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, Optional, List
+import json
 import os
 from datetime import datetime
 from .config import load_config
@@ -50,12 +51,17 @@ class APIClient:
         except requests.RequestException as e:
             raise Exception(f"Login failed: {str(e)}")
 
-    def fetch_documents(self, prompt_count: int = 5) -> Dict:
-        """Fetch documents from backend"""
+    def fetch_documents(self, limit: int = 50, cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> Dict:
+        """Fetch one page of the document catalog from backend"""
         try:
+            params = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            if columns:
+                params["columns"] = ",".join(columns)
             response = requests.get(
                 f"{self.base_url}/documents",
-                params={"prompt_count": prompt_count},
+                params=params,
                 headers=self._get_headers()
             )
             response.raise_for_status()
@@ -88,6 +94,59 @@ class APIClient:
         except requests.RequestException as e:
             raise Exception(f"Error processing question: {str(e)}")
 
+    def _stream_tokens(self, path: str, payload: Optional[Dict] = None, done: Optional[Dict] = None) -> Iterator[str]:
+        """Yield tokens from a server-sent event stream until its done event.
+
+        ``done`` (if given) is filled with the done event's data.
+        """
+        with requests.post(
+            f"{self.base_url}{path}",
+            json=payload,
+            headers={**self._get_headers(), "Accept": "text/event-stream"},
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    event = None
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):].strip())
+                    if event == "error":
+                        raise Exception(data.get("detail", "Stream failed"))
+                    if event == "done":
+                        if done is not None:
+                            done.update(data)
+                        return
+                    yield data["token"]
+
+    def stream_document_summary(self, document_id: str) -> Iterator[str]:
+        """Stream document summary tokens as they are generated"""
+        try:
+            yield from self._stream_tokens(f"/documents/{document_id}/summary/stream")
+        except requests.RequestException as e:
+            raise Exception(f"Error getting document summary: {str(e)}")
+
+    def stream_research_summary(self, document_id: str) -> Iterator[str]:
+        """Stream research summary tokens as they are generated"""
+        try:
+            yield from self._stream_tokens(f"/documents/{document_id}/research-summary/stream")
+        except requests.RequestException as e:
+            raise Exception(f"Error getting research summary: {str(e)}")
+
+    def stream_answer(self, document_id: str, question: str, result: Optional[Dict] = None) -> Iterator[str]:
+        """Stream answer tokens for a question; ``result`` receives the confidence and references"""
+        try:
+            yield from self._stream_tokens(
+                "/qa/ask/stream",
+                {"document_id": document_id, "question": question},
+                done=result
+            )
+        except requests.RequestException as e:
+            raise Exception(f"Error processing question: {str(e)}")
+
     def search_documents(self, query: str, search_type: str = "all") -> Dict:
         """Search documents and research notes"""
         try:
@@ -1,5 +1,10 @@
 import os
 import requests
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import logging
 import re
 import json
@@ -20,6 +25,16 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Download stage: shared session, bounded concurrency and per-host limits
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '8'))
+DOWNLOAD_PER_HOST = int(os.getenv('DOWNLOAD_PER_HOST', '4'))
+DOWNLOAD_RETRIES = int(os.getenv('DOWNLOAD_RETRIES', '3'))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))
+DOWNLOAD_TIMEOUT = float(os.getenv('DOWNLOAD_TIMEOUT', '60'))
+RETRY_STATUSES = frozenset([408, 429, 500, 502, 503, 504])
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
 # Function to clean titles
 def clean_title(title):
     return title.replace('\n', ' ').strip()
@@ -34,23 +49,108 @@ def extract_detail_data(driver):
         pdf_link = 'https://rpc.cfainstitute.org' + pdf_link
     return pdf_link
 
-def download_file(url, download_folder, filename):
-    if url and url != 'N/A':
-        try:
-            logger.info(f"Downloading: {url}")
-            response = requests.get(url)
-            response.raise_for_status()
-            if not os.path.exists(download_folder):
-                os.makedirs(download_folder)
-            safe_filename = filename.replace('/', '-')
-            file_path = os.path.join(download_folder, safe_filename)
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-            logger.info(f"Downloaded: {file_path}")
-            return file_path
-        except Exception as e:
-            logger.error(f"Failed to download {url}: {e}")
+def _host_slot(url):
+    """Per-host semaphore so concurrent downloads stay polite to each server."""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(DOWNLOAD_PER_HOST)
+        return _host_limits[host]
+
+def create_download_session():
+    """Session whose keep-alive connection pool is shared by all download threads.
+
+    The adapter does not retry: download_file is the only retry layer, so
+    backoff never happens while a host slot is held.
+    """
+    adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def _stream_to_file(session, url, part_path, known=None):
+    """Stream url into part_path in chunks, resuming a partial file when the server supports ranges.
+
+    Returns the response headers, or None when the server reports that the
+    copy described by ``known`` (its ETag / Last-Modified) is unchanged.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    if not offset and known:
+        if known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+    logger.info(f"Downloading: {url}" + (f" (resuming at {offset} bytes)" if offset else ""))
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
             return None
+        if offset and response.status_code == 416:
+            # The partial file already holds the whole body
+            return response.headers
+        response.raise_for_status()
+        # A server that ignores Range answers 200 with the full body
+        mode = 'ab' if offset and response.status_code == 206 else 'wb'
+        with open(part_path, mode) as file:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+        return response.headers
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retrying, or None when the error will not go away on retry."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return 2 ** attempt  # connection errors and timeouts
+    if response.status_code not in RETRY_STATUSES:
+        return None
+    retry_after = response.headers.get('Retry-After', '')
+    return int(retry_after) if retry_after.isdigit() else 2 ** attempt
+
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_file(url, download_folder, filename, session=None, known=None):
+    """Download url into download_folder, returning the file's path, validators and content hash.
+
+    ``unchanged`` is set when the server answers 304 to the validators in
+    ``known`` or the downloaded content hashes the same as before.
+    """
+    if url and url != 'N/A':
+        session = session or requests
+        os.makedirs(download_folder, exist_ok=True)
+        safe_filename = filename.replace('/', '-')
+        file_path = os.path.join(download_folder, safe_filename)
+        part_path = file_path + '.part'
+        for attempt in range(DOWNLOAD_RETRIES + 1):
+            try:
+                with _host_slot(url):
+                    headers = _stream_to_file(session, url, part_path, known)
+                if headers is None:
+                    logger.info(f"Unchanged since last run: {url}")
+                    return dict(known or {}, path=None, unchanged=True)
+                os.replace(part_path, file_path)
+                content_hash = _file_hash(file_path)
+                logger.info(f"Downloaded: {file_path}")
+                return {
+                    'path': file_path,
+                    'etag': headers.get('ETag'),
+                    'last_modified': headers.get('Last-Modified'),
+                    'content_hash': content_hash,
+                    'unchanged': bool(known) and known.get('content_hash') == content_hash
+                }
+            except Exception as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == DOWNLOAD_RETRIES:
+                    logger.error(f"Failed to download {url}: {e}")
+                    return None
+                # The host slot was released when the request failed, so other downloads proceed meanwhile
+                logger.warning(f"Retrying {url} in {delay}s after error: {e}")
+                time.sleep(delay)
     return None
 
 def clean_filename(filename):
@@ -60,8 +160,11 @@ def generate_authenticated_url(bucket_name, destination_blob_name):
     """Generate an authenticated URL for GCS."""
     return f"https://storage.googleapis.com/{bucket_name}/{urllib.parse.quote(destination_blob_name)}"
 
-def upload_to_gcs(bucket_name, source_folder, destination_blob_name):
-    """Uploads specific folders to a GCS bucket and returns URLs for the uploaded files."""
+def upload_to_gcs(bucket_name, source_folder, destination_blob_name, only_folders=None):
+    """Uploads specific folders to a GCS bucket and returns URLs for the uploaded files.
+
+    When ``only_folders`` is given, other publication folders are left alone.
+    """
     client = storage.Client()
     bucket = client.bucket(bucket_name)
 
@@ -73,6 +176,8 @@ def upload_to_gcs(bucket_name, source_folder, destination_blob_name):
     for publication_folder in os.listdir(source_folder):
         folder_path = os.path.join(source_folder, publication_folder)
 
+        if only_folders is not None and publication_folder not in only_folders:
+            continue
         if os.path.isdir(folder_path) and publication_folder not in exclude_dirs:
             pdf_gcs_link = None
             image_gcs_link = None
@@ -80,6 +185,9 @@ def upload_to_gcs(bucket_name, source_folder, destination_blob_name):
             # Upload files and capture GCS links
             for dirpath, _, filenames in os.walk(folder_path):
                 for filename in filenames:
+                    # Skip downloads that never completed
+                    if filename.endswith('.part'):
+                        continue
                     # File paths and cleaned name
                     local_file_path = os.path.join(dirpath, filename)
                     clean_name = clean_filename(filename)
@@ -112,18 +220,76 @@ def upload_json_to_gcs(bucket_name, json_file_name, destination_blob_name):
     blob.upload_from_filename(json_file_name)
     logger.info(f"Uploaded JSON file to GCS: gs://{bucket_name}/{destination_blob_name}")
 
+def load_manifest(bucket_name, manifest_blob_name, manifest_file_name):
+    """Load the manifest of already-scraped publications from GCS (or a local copy), keyed by title."""
+    try:
+        blob = storage.Client().bucket(bucket_name).blob(manifest_blob_name)
+        if blob.exists():
+            blob.download_to_filename(manifest_file_name)
+    except Exception as e:
+        logger.warning(f"Could not fetch manifest from GCS, using any local copy: {e}")
+    if not os.path.exists(manifest_file_name):
+        return {}
+    with open(manifest_file_name, 'r', encoding='utf-8') as manifest_file:
+        entries = json.load(manifest_file).get('publications', [])
+    logger.info(f"Loaded manifest with {len(entries)} publications")
+    return {entry['title']: entry for entry in entries}
+
+def save_manifest(manifest, bucket_name, manifest_blob_name, manifest_file_name):
+    """Write the manifest locally and to GCS so the next run can skip known publications."""
+    with open(manifest_file_name, 'w', encoding='utf-8') as manifest_file:
+        json.dump({'version': 1, 'publications': list(manifest.values())}, manifest_file, ensure_ascii=False, indent=4)
+    upload_json_to_gcs(bucket_name, manifest_file_name, manifest_blob_name)
+
+def _missing_files(entry):
+    """Kinds ('pdf', 'image') of an entry whose download or GCS upload has not succeeded yet."""
+    missing = []
+    files = entry.get('files') or {}
+    if entry.get('pdf_link', 'N/A') != 'N/A' and not ('pdf' in files and entry.get('pdf_gcs_link')):
+        missing.append('pdf')
+    image_link = entry.get('image_link', 'N/A')
+    # upload_to_gcs only links these image types, so others could never look complete
+    linkable = clean_filename(image_link).lower().endswith(('.png', '.jpg', '.jpeg'))
+    if image_link != 'N/A' and linkable and not ('image' in files and entry.get('image_gcs_link')):
+        missing.append('image')
+    return missing
+
+def _submit_downloads(download_pool, session, title, pdf_link, image_src, previous_files, kinds=('pdf', 'image')):
+    """Queue the publication's PDF and image downloads; returns their futures keyed by kind."""
+    publication_folder = clean_title(title)
+    futures = {}
+    if 'pdf' in kinds:
+        futures['pdf'] = download_pool.submit(
+            download_file, pdf_link, publication_folder, f"{title}.pdf", session, previous_files.get('pdf')
+        )
+    if 'image' in kinds and image_src != 'N/A':
+        file_extension = image_src.split('.')[-1]
+        futures['image'] = download_pool.submit(
+            download_file, image_src, publication_folder, f"{title}.{file_extension}", session,
+            previous_files.get('image')
+        )
+    return futures
+
 def scrape_publications():
     logger.info("Starting data extraction...")
     gcs_bucket_name = os.getenv('BUCKET_NAME')
     json_file_name = os.getenv('JSON_FILE_NAME', 'cfa_publications.json')
     gcs_path = os.getenv('GCS_PATH', 'cfai_publications')
+    manifest_file_name = os.getenv('MANIFEST_FILE_NAME', 'publication_manifest.json')
+    manifest_blob_name = gcs_path + '/' + manifest_file_name
+    # Set FULL_RESCRAPE=true to ignore the manifest and revisit every publication
+    full_rescrape = os.getenv('FULL_RESCRAPE', 'false').lower() == 'true'
+    manifest = {} if full_rescrape else load_manifest(gcs_bucket_name, manifest_blob_name, manifest_file_name)
     service = Service()  # You may need to specify the path to your geckodriver
     options = webdriver.FirefoxOptions()
     options.add_argument("--headless")
     driver = webdriver.Firefox(service=service, options=options)
-    all_data = []
+    session = create_download_session()
+    download_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    downloads = {}
+    # Manifest entries of publications seen this run, in listing order
+    crawled = {}
     seen_titles = set()
-    publication_index = 1
 
     try:
         driver.get("https://rpc.cfainstitute.org/en/research-foundation/publications#sort=%40officialz32xdate%20descending&f:SeriesContent=[Research%20Foundation]")
@@ -135,6 +301,7 @@ def scrape_publications():
             if not publications:
                 logger.warning("No publications found on the page.")
                 break
+            page_all_known = True
             for publication in publications:
                 title_element = publication.find('h4', class_='coveo-title')
                 title = title_element.get_text(strip=True) if title_element else 'N/A'
@@ -146,6 +313,13 @@ def scrape_publications():
                 detail_link = title_element.find('a')['href'] if title_element and title_element.find('a') else None
                 if detail_link and not detail_link.startswith('http'):
                     detail_link = 'https://rpc.cfainstitute.org' + detail_link
+                known = manifest.get(title)
+                missing = _missing_files(known) if known else []
+                if known and known.get('detail_url') == detail_link and not missing:
+                    # Seen on an earlier run: no detail page or downloads needed
+                    crawled[title] = known
+                    continue
+                page_all_known = False
                 date_element = publication.find('span', class_='date')
                 publication_date = date_element.get_text(strip=True) if date_element else 'N/A'
                 image_element = publication.find('img', class_='coveo-result-image')
@@ -154,33 +328,39 @@ def scrape_publications():
                     image_src = 'https://rpc.cfainstitute.org' + image_src
                 summary_element = publication.find('div', class_='result-body')
                 summary = summary_element.get_text(strip=True) if summary_element else 'N/A'
+                # Files that never made it to GCS are fetched in full, without validators
+                previous_files = {
+                    kind: validators for kind, validators in ((known or {}).get('files') or {}).items()
+                    if kind not in missing
+                }
                 pdf_link = 'N/A'
                 if detail_link:
                     logger.info(f"Loading detail page for: {title}...")
                     driver.get(detail_link)
                     WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, "grid__item--article-element")))
                     pdf_link = extract_detail_data(driver)
-                    publication_folder = clean_title(title)
-                    if not os.path.exists(publication_folder):
-                        os.makedirs(publication_folder)
-                    download_file(pdf_link, publication_folder, f"{title}.pdf")
-                    if image_src != 'N/A':
-                        file_extension = image_src.split('.')[-1]
-                        download_file(image_src, publication_folder, f"{title}.{file_extension}")
+                    # Downloads run in the background while the crawl continues
+                    downloads[title] = _submit_downloads(download_pool, session, title, pdf_link, image_src, previous_files)
                     driver.back()
                     WebDriverWait(driver, 20).until(EC.presence_of_all_elements_located((By.CLASS_NAME, "RPCAllsiteSearchResultList")))
-                
-                # Add GCS links to all_data
-                all_data.append({
-                    'Index': publication_index,
-                    'Title': title,
-                    'Date': publication_date,
-                    'Summary': summary,
-                    'PDF Link': pdf_link,  # Keep the local PDF link for downloading
-                    'Image Link': image_src  # Local image link for downloading
-                })
-                publication_index += 1
-            
+
+                crawled[title] = {
+                    'title': title,
+                    'detail_url': detail_link,
+                    'date': publication_date,
+                    'summary': summary,
+                    'pdf_link': pdf_link,  # Keep the local PDF link for downloading
+                    'image_link': image_src,  # Local image link for downloading
+                    'files': dict(previous_files),
+                    'pdf_gcs_link': (known or {}).get('pdf_gcs_link'),
+                    'image_gcs_link': (known or {}).get('image_gcs_link')
+                }
+
+            if page_all_known and manifest:
+                # Listings are newest first, so later pages hold only known publications too
+                logger.info("Reached a page of already-seen publications; stopping early.")
+                break
+
             try:
                 next_button = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "coveo-pager-next")))
                 if 'disabled' in next_button.get_attribute('class'):
@@ -193,18 +373,58 @@ def scrape_publications():
                 logger.error(f"Error navigating to the next page: {e}")
                 break
 
-        # Upload files to GCS and get their links
-        publication_links = upload_to_gcs(gcs_bucket_name, '.', gcs_path)
+        # Publications past the early stop keep their manifest entries
+        for title, entry in manifest.items():
+            crawled.setdefault(title, entry)
+
+        # Retry files that failed or never reached GCS on earlier runs, even past the early stop
+        for title, entry in crawled.items():
+            if title in downloads:
+                continue
+            missing = _missing_files(entry)
+            if missing:
+                logger.info(f"Retrying incomplete files {missing} for: {title}")
+                entry['files'] = {kind: validators for kind, validators in (entry.get('files') or {}).items() if kind not in missing}
+                downloads[title] = _submit_downloads(
+                    download_pool, session, title, entry['pdf_link'], entry['image_link'], entry['files'], kinds=missing
+                )
+
+        # Every file must be on disk before the folders are uploaded
+        changed_folders = set()
+        for title, futures in downloads.items():
+            for kind, future in futures.items():
+                result = future.result()
+                if result is None:
+                    continue  # failed; keep what the manifest had
+                crawled[title]['files'][kind] = {
+                    key: result.get(key) for key in ('etag', 'last_modified', 'content_hash')
+                }
+                if not result['unchanged']:
+                    changed_folders.add(clean_title(title))
 
-        # Append GCS links to JSON data
-        for item in all_data:
-            title_key = clean_title(item['Title'])
-            if title_key in publication_links:
-                item['pdf_gcs_link'] = publication_links[title_key].get('pdf_gcs_link')
-                item['image_gcs_link'] = publication_links[title_key].get('image_gcs_link')
-            else:
-                item['pdf_gcs_link'] = None
-                item['image_gcs_link'] = None
+        # Upload only folders with new or changed files and get their links
+        publication_links = upload_to_gcs(gcs_bucket_name, '.', gcs_path, only_folders=changed_folders)
+        for title, entry in crawled.items():
+            links = publication_links.get(clean_title(title), {})
+            entry['pdf_gcs_link'] = links.get('pdf_gcs_link') or entry.get('pdf_gcs_link')
+            entry['image_gcs_link'] = links.get('image_gcs_link') or entry.get('image_gcs_link')
+
+        # The load replaces the table, so the JSON lists every known publication
+        all_data = [
+            {
+                'Index': publication_index,
+                'Title': entry['title'],
+                'Date': entry['date'],
+                'Summary': entry['summary'],
+                'PDF Link': entry['pdf_link'],
+                'Image Link': entry['image_link'],
+                'pdf_gcs_link': entry.get('pdf_gcs_link'),
+                'image_gcs_link': entry.get('image_gcs_link')
+            }
+            for publication_index, entry in enumerate(crawled.values(), start=1)
+        ]
+        incomplete = sum(1 for entry in crawled.values() if _missing_files(entry))
+        logger.info(f"{len(downloads)} new, changed or retried publications, {len(all_data)} in total, {incomplete} still incomplete")
 
         # Save JSON to file
         with open(json_file_name, 'w', encoding='utf-8') as json_file:
@@ -214,9 +434,14 @@ def scrape_publications():
         # Upload JSON to GCS
         upload_json_to_gcs(gcs_bucket_name, json_file_name, gcs_path + '/' + json_file_name)
 
+        # Persist the manifest last, once everything it describes is uploaded
+        save_manifest(crawled, gcs_bucket_name, manifest_blob_name, manifest_file_name)
+
     except Exception as e:
         logger.error(f"An error occurred: {e}")
     finally:
+        download_pool.shutdown(wait=True)
+        session.close()
         driver.quit()
 
 if __name__ == "__main__":
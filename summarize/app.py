@@ -6,7 +6,10 @@ from google.cloud import storage
 from dotenv import load_dotenv
 import fitz  # PyMuPDF
 import os
-from openai import OpenAI
+import asyncio
+import tempfile
+from openai import AsyncOpenAI
+from nvidia_client import estimate_tokens, get_nvidia_client
 
 # Load environment variables
 load_dotenv()
@@ -28,7 +31,11 @@ SNOWFLAKE_SCHEMA = os.getenv("SNOWFLAKE_SCHEMA")
 
 # NVIDIA API configurations
 API_KEY = os.getenv("NVIDIA_API_KEY")
-TRITON_SERVER_URL = "https://integrate.api.nvidia.com/v1"
+TRITON_SERVER_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
+SUMMARY_MAX_TOKENS = 150
+
+# PDFs downloaded, extracted and summarized at the same time
+PDF_WORKERS = int(os.getenv("SUMMARIZE_PDF_WORKERS", "8"))
 
 # GCP configurations
 GCP_BUCKET_NAME = os.getenv("GCP_BUCKET_NAME")
@@ -101,17 +108,19 @@ def extract_text_from_pdf(pdf_path):
         logger.error(f"Error extracting text from PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}")
 
-def generate_summary_from_text(extracted_text):
+# Retries are handled by the shared NVIDIA client, not the SDK
+openai_client = AsyncOpenAI(
+    base_url=TRITON_SERVER_URL,
+    api_key=API_KEY,
+    max_retries=0
+)
+nvidia_client = get_nvidia_client()
+
+async def generate_summary_from_text(extracted_text):
     """Generate a summary using the NVIDIA model."""
     try:
         # Log the start of summary generation
         logger.info("Generating summary using NVIDIA API...")
-        
-        # Create OpenAI client
-        openai_client = OpenAI(
-            base_url=TRITON_SERVER_URL,
-            api_key=API_KEY
-        )
 
         # Prepare prompt message
         prompt_message = [{
@@ -119,14 +128,17 @@ def generate_summary_from_text(extracted_text):
             'content': f"Summarize the following text in a concise way: \n{extracted_text}"
         }]
 
-        # Make completion request
-        completion_response = openai_client.chat.completions.create(
-            model="meta/llama-3.1-405b-instruct",
-            messages=prompt_message,
-            temperature=0.2,
-            top_p=0.7,
-            max_tokens=150,
-            stream=False
+        # Make completion request under the shared rate limits
+        completion_response = await nvidia_client.call(
+            lambda: openai_client.chat.completions.create(
+                model="meta/llama-3.1-405b-instruct",
+                messages=prompt_message,
+                temperature=0.2,
+                top_p=0.7,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                stream=False
+            ),
+            estimated_tokens=estimate_tokens(prompt_message[0]['content'], SUMMARY_MAX_TOKENS)
         )
 
         # Log the full API response for debugging
@@ -145,41 +157,64 @@ def generate_summary_from_text(extracted_text):
         logger.error(f"Error generating summary: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
 
+async def summarize_pdf_url(pdf_url):
+    """Download, extract and summarize one PDF; returns None when it has no text."""
+    # A unique temp file per call, so URLs sharing a basename never collide
+    fd, local_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        # Download and extraction block, so they run in worker threads
+        await asyncio.to_thread(download_pdf_from_gcs, pdf_url, local_path)
+        extracted_text = await asyncio.to_thread(extract_text_from_pdf, local_path)
+        if not extracted_text:
+            logger.warning(f"No text found in PDF: {pdf_url}")
+            return None
+        
+        # Generate summary from extracted text
+        summary = await generate_summary_from_text(extracted_text)
+        return {"pdf_url": pdf_url, "summary": summary}
+    finally:
+        # Clean up temporary file
+        if os.path.exists(local_path):
+            os.remove(local_path)
+            logger.info(f"Processed and removed temporary file: {local_path}")
+
 @app.get("/process-pdfs")
-def process_pdfs():
+async def process_pdfs():
     try:
         logger.info("Starting PDF processing...")
 
-        # Connect to Snowflake
-        conn = get_snowflake_connection()
-        
-        # Fetch PDF URLs
-        pdf_urls = fetch_pdf_urls_from_snowflake(conn)
+        # Connect to Snowflake and fetch PDF URLs; the connector blocks, so it runs in a thread
+        conn = await asyncio.to_thread(get_snowflake_connection)
+        try:
+            pdf_urls = await asyncio.to_thread(fetch_pdf_urls_from_snowflake, conn)
+        finally:
+            await asyncio.to_thread(conn.close)
         
-        # Process each PDF URL
-        summaries = []
-        for pdf_url in pdf_urls:
-            local_path = f"/tmp/{os.path.basename(pdf_url)}"
-            
-            # Download the PDF from GCS
-            download_pdf_from_gcs(pdf_url, local_path)
-            
-            # Extract text from the PDF
-            extracted_text = extract_text_from_pdf(local_path)
-            if not extracted_text:
-                logger.warning(f"No text found in PDF: {pdf_url}")
-                continue
-            
-            # Generate summary from extracted text
-            summary = generate_summary_from_text(extracted_text)
-            summaries.append({"pdf_url": pdf_url, "summary": summary})
-            
-            # Clean up temporary file
-            os.remove(local_path)
-            logger.info(f"Processed and removed temporary file: {local_path}")
+        # Bound how many PDFs are on local disk at once; the NVIDIA client paces the API calls
+        semaphore = asyncio.Semaphore(PDF_WORKERS)
+
+        async def summarize_bounded(pdf_url):
+            async with semaphore:
+                return await summarize_pdf_url(pdf_url)
+
+        # One failing PDF must not discard the summaries of the others
+        results = await asyncio.gather(
+            *[summarize_bounded(pdf_url) for pdf_url in pdf_urls],
+            return_exceptions=True
+        )
+        summaries, failures = [], []
+        for pdf_url, result in zip(pdf_urls, results):
+            if isinstance(result, Exception):
+                failures.append({"pdf_url": pdf_url, "error": getattr(result, "detail", None) or str(result)})
+            elif result:
+                summaries.append(result)
         
-        logger.info("Successfully processed all PDFs")
-        return JSONResponse(content={"summaries": summaries})
+        logger.info(
+            f"Processed {len(pdf_urls)} PDFs: {len(summaries)} summarized, {len(failures)} failed "
+            f"(client stats: {nvidia_client.stats()})"
+        )
+        return JSONResponse(content={"summaries": summaries, "failures": failures})
     
     except Exception as e:
         logger.error(f"Error processing PDFs: {str(e)}")
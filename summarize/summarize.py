@@ -1,19 +1,30 @@
 import fitz  # PyMuPDF
 import os
+import asyncio
 import requests
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+from nvidia_client import estimate_tokens, get_nvidia_client
 
 # Load environment variables from .env file
 load_dotenv()
 
 # NVIDIA API configurations
 API_KEY = os.getenv("NVIDIA_API_KEY")
-TRITON_SERVER_URL = "https://integrate.api.nvidia.com/v1"
+TRITON_SERVER_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
+SUMMARY_MAX_TOKENS = 150
 
 if not API_KEY or not TRITON_SERVER_URL:
     raise EnvironmentError("NVIDIA API_KEY or TRITON_SERVER_URL not found in environment variables")
 
+# Retries are handled by the shared NVIDIA client, not the SDK
+openai_client = AsyncOpenAI(
+    base_url=TRITON_SERVER_URL,
+    api_key=API_KEY,
+    max_retries=0
+)
+nvidia_client = get_nvidia_client()
+
 def extract_text_from_pdf(pdf_path):
     """Extract text from a PDF file using PyMuPDF."""
     try:
@@ -26,15 +37,9 @@ def extract_text_from_pdf(pdf_path):
         print(f"Error extracting text from PDF: {str(e)}")
         return None
 
-def generate_summary_from_text(extracted_text):
+async def generate_summary_from_text(extracted_text):
     """Generate a summary using the NVIDIA model."""
     try:
-        # Create OpenAI client
-        openai_client = OpenAI(
-            base_url=TRITON_SERVER_URL,
-            api_key=API_KEY
-        )
-
         # Prepare prompt message
         prompt_message = [{
             'role': 'user',
@@ -42,18 +47,24 @@ def generate_summary_from_text(extracted_text):
         }]
 
         # Make completion request
-        completion_response = openai_client.chat.completions.create(
-            model="meta/llama-3.1-405b-instruct",
-            messages=prompt_message,
-            temperature=0.2,
-            top_p=0.7,
-            max_tokens=150,
-            stream=True
-        )
-
-        # Collect the generated summary
+        async def stream_completion():
+            completion_response = await openai_client.chat.completions.create(
+                model="meta/llama-3.1-405b-instruct",
+                messages=prompt_message,
+                temperature=0.2,
+                top_p=0.7,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                stream=True
+            )
+            async for chunk in completion_response:
+                yield chunk
+
+        # Collect the generated summary; the shared client paces and retries the request
         summary_text = ""
-        for chunk in completion_response:
+        async for chunk in nvidia_client.stream(
+            stream_completion,
+            estimated_tokens=estimate_tokens(prompt_message[0]['content'], SUMMARY_MAX_TOKENS)
+        ):
             if chunk.choices[0].delta.content is not None:
                 summary_text += chunk.choices[0].delta.content
 
@@ -75,7 +86,7 @@ def summarize_pdf_document(pdf_file_path):
     print("Extracted Text:", extracted_text[:500])  # Print the first 500 characters of extracted text for validation
 
     # Generate summary
-    summary = generate_summary_from_text(extracted_text)
+    summary = asyncio.run(generate_summary_from_text(extracted_text))
     if summary:
         print("Generated Summary:", summary)
     else:
@@ -102,7 +113,8 @@ import fitz  # PyMuPDF
 import os
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+from nvidia_client import estimate_tokens, get_nvidia_client
 
 # Load environment variables from .env file
 load_dotenv()
@@ -121,11 +133,20 @@ app.add_middleware(
 
 # NVIDIA API configurations
 API_KEY = os.getenv("NVIDIA_API_KEY")
-TRITON_SERVER_URL = "https://integrate.api.nvidia.com/v1"
+TRITON_SERVER_URL = os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1")
+SUMMARY_MAX_TOKENS = 150
 
 if not API_KEY or not TRITON_SERVER_URL:
     raise EnvironmentError("NVIDIA API_KEY or TRITON_SERVER_URL not found in environment variables")
 
+# Retries are handled by the shared NVIDIA client, not the SDK
+openai_client = AsyncOpenAI(
+    base_url=TRITON_SERVER_URL,
+    api_key=API_KEY,
+    max_retries=0
+)
+nvidia_client = get_nvidia_client()
+
 class SummarizeResponse(BaseModel):
     summary: str
 
@@ -140,15 +161,9 @@ def extract_text_from_pdf(pdf_path):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}")
 
-def generate_summary_from_text(extracted_text):
+async def generate_summary_from_text(extracted_text):
     """Generate a summary using the NVIDIA model."""
     try:
-        # Create OpenAI client
-        openai_client = OpenAI(
-            base_url=TRITON_SERVER_URL,
-            api_key=API_KEY
-        )
-
         # Prepare prompt message
         prompt_message = [{
             'role': 'user',
@@ -156,18 +171,24 @@ def generate_summary_from_text(extracted_text):
         }]
 
         # Make completion request
-        completion_response = openai_client.chat.completions.create(
-            model="meta/llama-3.1-405b-instruct",
-            messages=prompt_message,
-            temperature=0.2,
-            top_p=0.7,
-            max_tokens=150,
-            stream=True
-        )
-
-        # Collect the generated summary
+        async def stream_completion():
+            completion_response = await openai_client.chat.completions.create(
+                model="meta/llama-3.1-405b-instruct",
+                messages=prompt_message,
+                temperature=0.2,
+                top_p=0.7,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                stream=True
+            )
+            async for chunk in completion_response:
+                yield chunk
+
+        # Collect the generated summary; the shared client paces and retries the request
         summary_text = ""
-        for chunk in completion_response:
+        async for chunk in nvidia_client.stream(
+            stream_completion,
+            estimated_tokens=estimate_tokens(prompt_message[0]['content'], SUMMARY_MAX_TOKENS)
+        ):
             if chunk.choices[0].delta.content is not None:
                 summary_text += chunk.choices[0].delta.content
 
@@ -193,7 +214,7 @@ async def summarize_pdf(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="No text found in PDF")
 
         # Generate summary from extracted text
-        summary = generate_summary_from_text(extracted_text)
+        summary = await generate_summary_from_text(extracted_text)
         if summary:
             return JSONResponse(content={"summary": summary})
         else: